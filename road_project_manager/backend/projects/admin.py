@@ -1,10 +1,11 @@
 from django.contrib import admin
-from .models import RoadProject, RoadSegment, ProjectPhoto, ProjectUpdate
+from .models import RoadProject, RoadSegment, ProjectPhoto, PhotoUpload, ProjectUpdate, StatsRollup, Tombstone
 
 
 @admin.register(RoadProject)
 class RoadProjectAdmin(admin.ModelAdmin):
     list_display = ['name', 'status', 'priority', 'created_by', 'created_at']
+    list_select_related = ['created_by']
     list_filter = ['status', 'priority', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at']
@@ -14,6 +15,7 @@ class RoadProjectAdmin(admin.ModelAdmin):
 @admin.register(RoadSegment)
 class RoadSegmentAdmin(admin.ModelAdmin):
     list_display = ['name', 'project', 'road_type', 'surface_type', 'length_km']
+    list_select_related = ['project']
     list_filter = ['road_type', 'surface_type', 'project']
     search_fields = ['name', 'project__name']
     readonly_fields = ['created_at', 'updated_at']
@@ -22,14 +24,37 @@ class RoadSegmentAdmin(admin.ModelAdmin):
 @admin.register(ProjectPhoto)
 class ProjectPhotoAdmin(admin.ModelAdmin):
     list_display = ['title', 'project', 'uploaded_by', 'taken_at']
+    list_select_related = ['project', 'uploaded_by']
     list_filter = ['project', 'taken_at']
     search_fields = ['title', 'description', 'project__name']
     readonly_fields = ['taken_at']
 
 
+@admin.register(PhotoUpload)
+class PhotoUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'project', 'created_by', 'received', 'size', 'updated_at']
+    list_select_related = ['project', 'created_by']
+    readonly_fields = ['received', 'photo', 'created_at', 'updated_at']
+
+
 @admin.register(ProjectUpdate)
 class ProjectUpdateAdmin(admin.ModelAdmin):
     list_display = ['title', 'project', 'created_by', 'created_at']
+    list_select_related = ['project', 'created_by']
     list_filter = ['project', 'created_at']
     search_fields = ['title', 'content', 'project__name']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['collection', 'object_id', 'deleted_at']
+    list_filter = ['collection']
+    readonly_fields = ['collection', 'object_id', 'deleted_at']
+
+
+@admin.register(StatsRollup)
+class StatsRollupAdmin(admin.ModelAdmin):
+    list_display = ['dimension', 'key', 'count', 'total']
+    list_filter = ['dimension']
+    readonly_fields = ['dimension', 'key', 'count', 'total']
@@ -0,0 +1,246 @@
+"""
+Server-side clustering of map markers, for photos and project centroids.
+
+Photos are clustered on a web-mercator grid. Every photo stores its cell
+at PHOTO_GRID_ZOOM (grid_x, grid_y), so its cell at any lower zoom is a
+right shift away and one zoom level's clusters are a single GROUP BY over
+an indexed range. Each tile is split into 4x4 cells (about 64 px apart on
+screen); a cluster reports its photo count, the mean position and extent
+of its photos and the newest photo as a representative thumbnail.
+
+Clusters are computed and cached per tile, keyed by the database version
+of the "photos" collection that the endpoint's ETag is also built from,
+so neighbouring viewports share work and any photo change, made by any
+worker, invalidates them.
+
+Projects are fewer but queried by every map view, so their clusters live
+in a process-local hierarchy (ProjectClusterIndex): per zoom level a dict
+of occupied cells with running sums. Adding or removing a project touches
+one cell per level, and a query reads only the cells of the viewport.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Max, Min
+
+from . import tiles
+from .models import PHOTO_GRID_ZOOM, ProjectPhoto
+from .spatial import SyncedProjectIndex, mercator, mercator_cell
+
+CELL_SHIFT = 2  # 2**2 x 2**2 cells per tile
+MAX_TILES = 1024
+PROJECT_CLUSTER_MAX_ZOOM = 16
+
+
+def covering_tiles(boxes, zoom):
+    """Tiles at zoom touching any of the (min_lat, min_lng, max_lat, max_lng) boxes, per box as (x0, y0, x1, y1)"""
+    ranges = []
+    count = 0
+    for min_lat, min_lng, max_lat, max_lng in boxes:
+        x0, y0 = mercator_cell(max_lat, min_lng, zoom)
+        x1, y1 = mercator_cell(min_lat, max_lng, zoom)
+        ranges.append((x0, y0, x1, y1))
+        count += (x1 - x0 + 1) * (y1 - y0 + 1)
+    if count > MAX_TILES:
+        raise ValueError(f'bbox covers {count} tiles at zoom {zoom}; zoom in or send a smaller bbox')
+    return ranges
+
+
+def _cache_key(version, project_id, zoom, x, y):
+    return f'photo-clusters:{version}:{project_id or "all"}:{zoom}/{x}/{y}'
+
+
+def _thumbnail(variants):
+    if not variants:
+        return None
+    return variants[min(variants, key=int)]
+
+
+def _compute(zoom, tile_range, project_id):
+    """Return {(x, y): [cluster, ...]} for the tiles in an (x0, y0, x1, y1) range"""
+    x0, y0, x1, y1 = tile_range
+    tile_shift = PHOTO_GRID_ZOOM - zoom
+    factor = 2 ** max(0, tile_shift - CELL_SHIFT)
+    photos = ProjectPhoto.objects.filter(
+        grid_x__gte=x0 << tile_shift, grid_x__lt=(x1 + 1) << tile_shift,
+        grid_y__gte=y0 << tile_shift, grid_y__lt=(y1 + 1) << tile_shift,
+    )
+    if project_id is not None:
+        photos = photos.filter(project_id=project_id)
+    cells = list(
+        photos.annotate(cell_x=F('grid_x') / factor, cell_y=F('grid_y') / factor)
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('id'), mean_lat=Avg('latitude'), mean_lng=Avg('longitude'),
+            min_lat=Min('latitude'), min_lng=Min('longitude'),
+            max_lat=Max('latitude'), max_lng=Max('longitude'), photo=Max('id'),
+        )
+        .order_by('cell_y', 'cell_x')
+    )
+    variants = dict(
+        ProjectPhoto.objects.filter(id__in=[cell['photo'] for cell in cells]).values_list('id', 'variants')
+    )
+
+    clusters = {}
+    for cell in cells:
+        tile = ((cell['cell_x'] * factor) >> tile_shift, (cell['cell_y'] * factor) >> tile_shift)
+        clusters.setdefault(tile, []).append({
+            'latitude': cell['mean_lat'],
+            'longitude': cell['mean_lng'],
+            'count': cell['count'],
+            'bbox': [cell['min_lng'], cell['min_lat'], cell['max_lng'], cell['max_lat']],
+            'photo': cell['photo'],
+            'thumbnail': _thumbnail(variants.get(cell['photo'])),
+        })
+    return clusters
+
+
+def photo_clusters(boxes, zoom, project_id=None, version=None):
+    """
+    Photo clusters of every tile at zoom covering the boxes.
+
+    Cached per tile under the "photos" collection version (versions.py);
+    views pass the one their ETag was computed from, so a response never
+    pairs a new ETag with clusters cached for an older version.
+
+    Thumbnails are storage names ({'width', 'height', 'jpeg', 'webp'} of
+    the smallest variant), or None while the photo is being processed.
+    Raises ValueError if the boxes cover more than MAX_TILES tiles.
+    """
+    ranges = covering_tiles(boxes, zoom)
+    if version is None:
+        version = tiles.layer_version('photos')
+    clusters = []
+    for tile_range in ranges:
+        x0, y0, x1, y1 = tile_range
+        keys = {
+            (x, y): _cache_key(version, project_id, zoom, x, y)
+            for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)
+        }
+        found = cache.get_many(keys.values())
+        if len(found) < len(keys):
+            # One query for the whole range; empty tiles are cached too
+            computed = _compute(zoom, tile_range, project_id)
+            missing = {key: computed.get(tile, []) for tile, key in keys.items() if key not in found}
+            cache.set_many(missing, getattr(settings, 'TILE_CACHE_TIMEOUT', 3600))
+            found.update(missing)
+        for key in keys.values():
+            clusters.extend(found[key])
+    return clusters
+
+
+class ClusterCell:
+    """Running totals of the projects in one cell of one zoom level"""
+    __slots__ = ['count', 'lat_sum', 'lng_sum', 'id_sum', 'statuses']
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lng_sum = 0.0
+        # With one member left this is its id
+        self.id_sum = 0
+        self.statuses = {}
+
+
+class ProjectClusterIndex(SyncedProjectIndex):
+    """
+    Hierarchical grid clusters of project centroids for zooms 0..max_zoom.
+
+    Like supercluster, a query at zoom z returns clusters about 64 px apart
+    with counts and centroids, and each cluster knows the zoom at which it
+    splits. Unlike supercluster's greedy radius pass, cells have fixed
+    positions, which is what makes single-project updates O(levels).
+    """
+    columns = ['id', 'latitude', 'longitude', 'status']
+
+    def __init__(self, max_zoom=PROJECT_CLUSTER_MAX_ZOOM):
+        super().__init__()
+        self.max_zoom = max_zoom
+        self.levels = None
+        self.members = {}
+
+    def reset(self):
+        self.levels = [{} for _ in range(self.max_zoom + 1)]
+        self.members = {}
+
+    def _keys(self, lat, lng):
+        n = 2 ** (self.max_zoom + CELL_SHIFT)
+        x, y = mercator(lat, lng)
+        x, y = min(n - 1, int(x * n)), min(n - 1, int(y * n))
+        # Parent cells are a shift away from the finest one
+        return [(x >> shift, y >> shift) for shift in range(self.max_zoom, -1, -1)]
+
+    def _apply(self, project_id, lat, lng, status, sign):
+        for level, key in zip(self.levels, self._keys(lat, lng)):
+            cell = level.get(key)
+            if cell is None:
+                cell = level[key] = ClusterCell()
+            cell.count += sign
+            if not cell.count:
+                del level[key]
+                continue
+            cell.lat_sum += sign * lat
+            cell.lng_sum += sign * lng
+            cell.id_sum += sign * project_id
+            cell.statuses[status] = cell.statuses.get(status, 0) + sign
+            if not cell.statuses[status]:
+                del cell.statuses[status]
+
+    def index_row(self, row):
+        self.remove(row['id'])
+        if row['latitude'] is not None and row['longitude'] is not None:
+            member = (row['latitude'], row['longitude'], row['status'])
+            self.members[row['id']] = member
+            self._apply(row['id'], *member, 1)
+
+    def remove(self, project_id):
+        member = self.members.pop(project_id, None)
+        if member is not None:
+            self._apply(project_id, *member, -1)
+
+    def _expansion_zoom(self, zoom, key):
+        """First zoom at which the cell's projects fall into more than one cell"""
+        x, y = key
+        for child_zoom in range(zoom + 1, self.max_zoom + 1):
+            x, y = x * 2, y * 2
+            children = [
+                (cx, cy) for cx in (x, x + 1) for cy in (y, y + 1)
+                if (cx, cy) in self.levels[child_zoom]
+            ]
+            if len(children) > 1:
+                return child_zoom
+            x, y = children[0]
+        return self.max_zoom + 1
+
+    def _cells(self, level, zoom, box):
+        min_lat, min_lng, max_lat, max_lng = box
+        x0, y0 = mercator_cell(max_lat, min_lng, zoom + CELL_SHIFT)
+        x1, y1 = mercator_cell(min_lat, max_lng, zoom + CELL_SHIFT)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(level):
+            # Sparse level: cheaper to filter occupied cells than walk the range
+            return [key for key in level if x0 <= key[0] <= x1 and y0 <= key[1] <= y1]
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (x, y) in level]
+
+    def clusters(self, boxes, zoom):
+        """Clusters with a member inside the boxes at zoom (deeper zooms use the finest level)"""
+        self.refresh()
+        zoom = min(zoom, self.max_zoom)
+        with self.lock:
+            level = self.levels[zoom]
+            # dict keeps the order and drops cells seen through both halves of a split bbox
+            keys = dict.fromkeys(key for box in boxes for key in self._cells(level, zoom, box))
+            result = []
+            for key in keys:
+                cell = level[key]
+                single = cell.count == 1
+                result.append({
+                    'latitude': cell.lat_sum / cell.count,
+                    'longitude': cell.lng_sum / cell.count,
+                    'count': cell.count,
+                    'statuses': dict(cell.statuses),
+                    'project': cell.id_sum if single else None,
+                    'expansion_zoom': None if single else self._expansion_zoom(zoom, key),
+                })
+        return result
+
+
+project_clusters = ProjectClusterIndex()
@@ -0,0 +1,194 @@
+"""
+Corridor queries: photos and projects within a buffer of a project's road.
+
+The road is densified so no piece is longer than PIECE_KM, then cut into
+chunks of about CHUNK_KM of road (at most CHUNK_PIECES pieces); both grow
+with buffers wider than half a chunk. Each chunk's bounding box, grown by
+the buffer, is an indexed prefilter in OR queries: for photos, one
+(grid_x, grid_y) index seek per grid column of the box, so only the box
+is read rather than a whole latitude band; for projects, an overlap with
+the bbox columns. Candidates are then measured exactly against the pieces
+of the chunks whose box they fall in, with NumPy over every
+candidate/piece pair of a chunk at once.
+
+The PostGIS backend answers the same question in SQL (spatial_backends.py);
+this module is what the in-process backend runs.
+"""
+import math
+
+import numpy as np
+from django.db import connection
+from django.db.models import Q
+
+from .geometry import densify, haversine_km, point_segment_km, polyline_array, segment_segment_km
+from .models import PHOTO_GRID_ZOOM, ProjectPhoto, RoadProject
+from .spatial import KM_PER_DEGREE, mercator_cell
+
+PIECE_KM = 0.25
+CHUNK_KM = 0.5
+CHUNK_PIECES = 64
+COLUMNS_PER_QUERY = 5000
+# Projects are few, so their prefilter uses coarser boxes: fewer terms, a few more candidates
+PROJECT_BOX_CHUNKS = 10
+PAIRS_PER_BATCH = 1 << 20
+
+
+def margins(buffer_km, max_abs_lat):
+    """(lat, lng) degrees covering buffer_km around anything no further from the equator than max_abs_lat"""
+    lat_margin = buffer_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(90.0, max_abs_lat + lat_margin)))
+    if cos_lat < 1e-9 or lat_margin / cos_lat >= 180.0:
+        return lat_margin, 360.0
+    return lat_margin, lat_margin / cos_lat
+
+
+class Corridor:
+    """A polyline grown by buffer_km, split into chunks with bounding boxes"""
+
+    def __init__(self, coordinates, buffer_km):
+        self.buffer_km = buffer_km
+        # Wide corridors get longer chunks, or neighbouring boxes would mostly overlap
+        chunk_km = max(CHUNK_KM, 2 * buffer_km)
+        vertices = densify(polyline_array(coordinates), chunk_km * PIECE_KM / CHUNK_KM)
+        if len(vertices) < 2:
+            raise ValueError('a corridor needs a polyline with at least two vertices')
+        starts, ends = vertices[:-1], vertices[1:]
+        lengths = haversine_km(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+        by_length = np.floor((np.cumsum(lengths) - lengths) / chunk_km)
+        first = np.flatnonzero(np.concatenate(([True], np.diff(by_length) != 0)))
+        position = np.arange(len(starts)) - np.repeat(first, np.diff(np.append(first, len(starts))))
+        offsets = np.flatnonzero(position % CHUNK_PIECES == 0)
+
+        low = np.minimum.reduceat(np.minimum(starts, ends), offsets)
+        high = np.maximum.reduceat(np.maximum(starts, ends), offsets)
+        boxes = []
+        for (min_lat, min_lng), (max_lat, max_lng) in zip(low.tolist(), high.tolist()):
+            lat_margin, lng_margin = margins(buffer_km, max(abs(min_lat), abs(max_lat)))
+            boxes.append((
+                max(-90.0, min_lat - lat_margin), max(-180.0, min_lng - lng_margin),
+                min(90.0, max_lat + lat_margin), min(180.0, max_lng + lng_margin),
+            ))
+        self.boxes = boxes
+        bounds = np.append(offsets, len(starts))
+        self.pieces = [(starts[a:b], ends[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def _nearest(self, boxes, measure):
+        """
+        Distance in km from each of n items to the corridor road, inf when no
+        chunk box holds it. boxes is (n, 4) min_lat, min_lng, max_lat, max_lng;
+        measure(indices, starts, ends) gives a (len(indices), pieces) distance matrix.
+        """
+        distances = np.full(len(boxes), np.inf)
+        if not len(boxes):
+            return distances
+        # Sweep over min_lat: an item in a chunk box starts at most one item height below it
+        order = np.argsort(boxes[:, 0], kind='stable')
+        sorted_min_lat = boxes[order, 0]
+        height = float((boxes[:, 2] - boxes[:, 0]).max())
+        for (min_lat, min_lng, max_lat, max_lng), (starts, ends) in zip(self.boxes, self.pieces):
+            members = order[np.searchsorted(sorted_min_lat, min_lat - height):
+                            np.searchsorted(sorted_min_lat, max_lat, side='right')]
+            box = boxes[members]
+            members = members[(box[:, 2] >= min_lat) & (box[:, 1] <= max_lng) & (box[:, 3] >= min_lng)]
+            step = max(1, PAIRS_PER_BATCH // len(starts))
+            for index in range(0, len(members), step):
+                batch = members[index:index + step]
+                nearest = measure(batch, starts[None], ends[None]).min(axis=1)
+                distances[batch] = np.minimum(distances[batch], nearest)
+        return distances
+
+    def point_distances(self, points):
+        """Distance in km from each (n, 2) [lat, lng] point to the road, inf far outside the corridor"""
+        return self._nearest(
+            np.hstack([points, points]),
+            lambda indices, starts, ends: point_segment_km(points[indices, None], starts, ends),
+        )
+
+    def segment_distances(self, starts, ends):
+        """Distance in km from each of n segments ((n, 2) ends) to the road, inf far outside the corridor"""
+        boxes = np.hstack([np.minimum(starts, ends), np.maximum(starts, ends)])
+        return self._nearest(
+            boxes,
+            lambda indices, road_starts, road_ends: segment_segment_km(
+                starts[indices, None], ends[indices, None], road_starts, road_ends
+            ),
+        )
+
+    def bbox_filter(self):
+        """Q matching projects whose bbox overlaps the chunk boxes, merged PROJECT_BOX_CHUNKS at a time"""
+        overlaps = Q()
+        for index in range(0, len(self.boxes), PROJECT_BOX_CHUNKS):
+            group = self.boxes[index:index + PROJECT_BOX_CHUNKS]
+            overlaps |= Q(
+                bbox_min_lat__lte=max(box[2] for box in group), bbox_max_lat__gte=min(box[0] for box in group),
+                bbox_min_lng__lte=max(box[3] for box in group), bbox_max_lng__gte=min(box[1] for box in group),
+            )
+        return overlaps
+
+    def grid_conditions(self):
+        """SQL conditions, one per query batch, matching photos whose grid cell is in a chunk box"""
+        tests, columns = [], 0
+        for min_lat, min_lng, max_lat, max_lng in self.boxes:
+            x0, y0 = mercator_cell(max_lat, min_lng, PHOTO_GRID_ZOOM)
+            x1, y1 = mercator_cell(min_lat, max_lng, PHOTO_GRID_ZOOM)
+            # An IN list seeks each column; a grid_x range would scan every row of the columns.
+            # The cells are integers computed here, so they are written into the SQL directly
+            tests.append(f"(grid_x IN ({','.join(map(str, range(x0, x1 + 1)))}) AND grid_y BETWEEN {y0} AND {y1})")
+            columns += x1 - x0 + 1
+            if columns >= COLUMNS_PER_QUERY:
+                yield ' OR '.join(tests)
+                tests, columns = [], 0
+        if tests:
+            yield ' OR '.join(tests)
+
+    def within(self, ids, distances):
+        """[(id, distance_km)] of the ids inside the buffer, closest first"""
+        inside = np.flatnonzero(distances <= self.buffer_km)
+        inside = inside[np.lexsort((ids[inside], distances[inside]))]
+        return list(zip(ids[inside].tolist(), distances[inside].tolist()))
+
+    def photos(self):
+        """[(photo_id, distance_km)] of located photos inside the corridor, closest first"""
+        rows = []
+        table = connection.ops.quote_name(ProjectPhoto._meta.db_table)
+        with connection.cursor() as cursor:
+            for condition in self.grid_conditions():
+                cursor.execute(f'SELECT id, latitude, longitude FROM {table} WHERE {condition}')
+                rows += cursor.fetchall()
+        if not rows:
+            return []
+        rows = np.array(rows, dtype=float)
+        # Boxes of neighbouring chunks overlap across query batches
+        _, unique = np.unique(rows[:, 0], return_index=True)
+        rows = rows[unique]
+        return self.within(rows[:, 0].astype(np.int64), self.point_distances(rows[:, 1:]))
+
+    def projects(self, exclude=None):
+        """[(project_id, distance_km)] of projects whose polyline or centre is inside the corridor, closest first"""
+        rows = list(
+            RoadProject.objects.filter(self.bbox_filter()).exclude(pk=exclude).order_by()
+            .values_list('id', 'latitude', 'longitude', 'polyline_coordinates')
+        )
+        if not rows:
+            return []
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        owners, starts, ends = [], [], []
+        for owner, (_, lat, lng, coordinates) in enumerate(rows):
+            vertices = polyline_array(coordinates)
+            if len(vertices) >= 2:
+                starts.append(vertices[:-1])
+                ends.append(vertices[1:])
+                owners.append(np.full(len(vertices) - 1, owner))
+            if lat is not None and lng is not None:
+                # The centre counts as a segment of length zero
+                centre = np.array([[lat, lng]], dtype=float)
+                starts.append(centre)
+                ends.append(centre)
+                owners.append(np.array([owner]))
+        distances = np.full(len(ids), np.inf)
+        if owners:
+            np.minimum.at(
+                distances, np.concatenate(owners),
+                self.segment_distances(np.concatenate(starts), np.concatenate(ends)),
+            )
+        return self.within(ids, distances)
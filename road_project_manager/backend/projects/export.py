@@ -0,0 +1,86 @@
+"""
+Streaming GeoJSON / NDJSON export of road projects.
+
+Rows are read through a server-side cursor and written out in batches,
+so memory stays flat and the first bytes leave before the query finishes.
+"""
+import json
+
+from .spatial import polyline_points
+
+EXPORT_FIELDS = [
+    'id', 'name', 'description', 'status', 'priority', 'budget',
+    'start_date', 'end_date', 'created_at', 'updated_at', 'created_by',
+    'polyline_color', 'polyline_length_km', 'latitude', 'longitude', 'polyline_coordinates',
+]
+PROPERTY_FIELDS = EXPORT_FIELDS[:-3]
+CONTENT_TYPES = {
+    'geojson': 'application/geo+json',
+    'ndjson': 'application/x-ndjson',
+}
+BATCH_SIZE = 500
+
+
+def _json_default(value):
+    # Decimal budgets and dates, matching the string form the API returns
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def feature_geometry(latitude, longitude, polyline_coordinates):
+    """GeoJSON geometry (lng, lat order) from the polyline, falling back to the centre point"""
+    coordinates = [[lng, lat] for lat, lng in polyline_points(polyline_coordinates)]
+    if len(coordinates) >= 2:
+        return {'type': 'LineString', 'coordinates': coordinates}
+    if latitude is not None and longitude is not None:
+        return {'type': 'Point', 'coordinates': [longitude, latitude]}
+    return None
+
+
+def features(queryset, chunk_size=2000):
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        properties = dict(zip(PROPERTY_FIELDS, row))
+        latitude, longitude, polyline_coordinates = row[-3:]
+        yield {
+            'type': 'Feature',
+            'id': properties['id'],
+            'geometry': feature_geometry(latitude, longitude, polyline_coordinates),
+            'properties': properties,
+        }
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= BATCH_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_geojson(queryset):
+    """Yield a FeatureCollection document in chunks"""
+    yield '{"type":"FeatureCollection","features":['
+    yield from _batched(
+        (',' if index else '') + json.dumps(feature, default=_json_default, separators=(',', ':'))
+        for index, feature in enumerate(features(queryset))
+    )
+    yield ']}\n'
+
+
+def stream_ndjson(queryset):
+    """Yield one GeoJSON Feature per line"""
+    yield from _batched(
+        json.dumps(feature, default=_json_default, separators=(',', ':')) + '\n'
+        for feature in features(queryset)
+    )
+
+
+STREAMS = {
+    'geojson': stream_geojson,
+    'ndjson': stream_ndjson,
+}
@@ -0,0 +1,127 @@
+"""
+Read-only fast path for project listings.
+
+Builds the same dicts as RoadProjectSerializer straight from .values()
+rows, without instantiating DRF fields per object: one query for the
+page's columns (creator username joined in) and one for the assignees of
+every project on the page. Values are formatted the way the DRF fields
+would (ISO datetimes with "Z", decimals as fixed-point strings).
+
+Decoding the JSON polyline columns dominates the cost, so they are read
+as text and parsed with orjson when it is installed, and the simplified
+levels are only read when the request asks for a tolerance.
+"""
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the standard library parser
+    orjson = None
+
+from .models import RoadProject
+from .serializers import RoadProjectSerializer, represent_polyline, sparse_field_names
+
+ROW_FIELDS = [
+    'id', 'name', 'description', 'status', 'priority', 'budget',
+    'start_date', 'end_date', 'created_at', 'updated_at',
+    'created_by', 'created_by__username',
+    'latitude', 'longitude', 'polyline_encoded', 'polyline_color', 'polyline_length_km',
+]
+BUDGET_QUANTUM = Decimal(1).scaleb(-RoadProject._meta.get_field('budget').decimal_places)
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def rows(queryset, context=None):
+    """Turn a RoadProject queryset into the .values() queryset the fast path reads"""
+    context = context or {}
+    json_columns = {}
+    if 'polyline_coordinates' in sparse_field_names(RoadProjectSerializer.Meta.fields, context):
+        json_columns['polyline_coordinates_json'] = Cast('polyline_coordinates', TextField())
+        if context.get('polyline_tolerance') is not None:
+            json_columns['polyline_levels_json'] = Cast('polyline_levels', TextField())
+    return queryset.select_related(None).prefetch_related(None).values(*ROW_FIELDS, **json_columns)
+
+
+def _json(value):
+    return _loads(value) if value is not None else None
+
+
+def _datetime(value):
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _decimal(value):
+    return '{:f}'.format(value.quantize(BUDGET_QUANTUM)) if value is not None else None
+
+
+def _assignees(project_ids):
+    through = RoadProject.assigned_to.through
+    assigned = defaultdict(list)
+    pairs = (
+        through.objects.filter(roadproject_id__in=project_ids)
+        .order_by('roadproject_id', 'user_id')
+        .values_list('roadproject_id', 'user_id', 'user__username')
+    )
+    for project_id, user_id, username in pairs:
+        assigned[project_id].append((user_id, username))
+    return assigned
+
+
+def represent(project_rows, context=None):
+    """Serialize .values() rows from rows(queryset, context) exactly as RoadProjectSerializer would"""
+    context = context or {}
+    project_rows = list(project_rows)
+    kept = sparse_field_names(RoadProjectSerializer.Meta.fields, context)
+    sparse = len(kept) < len(RoadProjectSerializer.Meta.fields)
+    if 'assigned_to' in kept or 'assigned_to_names' in kept:
+        assigned = _assignees([row['id'] for row in project_rows])
+    else:
+        assigned = {}
+    result = []
+    for row in project_rows:
+        users = assigned.get(row['id'], ())
+        data = {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'budget': _decimal(row['budget']),
+            'start_date': _date(row['start_date']),
+            'end_date': _date(row['end_date']),
+            'created_at': _datetime(row['created_at']),
+            'updated_at': _datetime(row['updated_at']),
+            'created_by': row['created_by'],
+            'created_by_name': row['created_by__username'],
+            'assigned_to': [user_id for user_id, _ in users],
+            'assigned_to_names': [username for _, username in users],
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'polyline_coordinates': _json(row.get('polyline_coordinates_json')),
+            'polyline_color': row['polyline_color'],
+            'polyline_length_km': row['polyline_length_km'],
+        }
+        if sparse:
+            data = {name: data[name] for name in kept}
+        if 'polyline_coordinates' in data:
+            data = represent_polyline(
+                data, data['polyline_coordinates'], _json(row.get('polyline_levels_json')),
+                row['polyline_encoded'], context
+            )
+        result.append(data)
+    return result
@@ -0,0 +1,84 @@
+"""
+Per-object cache of serialized RoadProject dicts.
+
+Each fragment is keyed by the project's id and updated_at plus the
+serializer variant (simplification tolerance, geometry format and sparse
+fieldset), so an edit only re-serializes that one project; list responses
+fetch every fragment of the page with one get_many. assigned_to changes touch the
+project's updated_at (see signals), which retires its fragments too.
+Responses clipped to a viewport are not cached.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class FragmentStats:
+    """Process-local hit/miss counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def as_dict(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.hits = self.misses = 0
+
+
+stats = FragmentStats()
+
+
+def fragment_cache():
+    return caches['fragments']
+
+
+def variant(context):
+    """Cache variant for a serializer context, or None when output is viewport specific"""
+    if context.get('polyline_clip_boxes'):
+        return None
+    fields = context.get('sparse_fields')
+    fieldset = f"{','.join(sorted(fields)) if fields is not None else '*'}-{','.join(sorted(context.get('sparse_omit') or ()))}"
+    return f"{context.get('polyline_tolerance')}:{context.get('geometry_format') or 'json'}:{fieldset}"
+
+
+def fragment_key(instance, variant):
+    return f'fragments:project:{instance.pk}:{instance.updated_at.isoformat()}:{variant}'
+
+
+def serialize_many(serializer, instances):
+    """Serialize instances with serializer.to_representation, reusing cached fragments"""
+    instances = list(instances)
+    current = variant(serializer.context)
+    if current is None:
+        return [serializer.to_representation(instance) for instance in instances]
+
+    cache = fragment_cache()
+    keys = [fragment_key(instance, current) for instance in instances]
+    cached = cache.get_many(keys)
+    fresh = {}
+    result = []
+    for key, instance in zip(keys, instances):
+        data = cached.get(key)
+        if data is None:
+            data = fresh[key] = serializer.to_representation(instance)
+        result.append(data)
+    if fresh:
+        cache.set_many(fresh, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 86400))
+    stats.record(hits=len(instances) - len(fresh), misses=len(fresh))
+    return result
@@ -0,0 +1,292 @@
+"""
+Indexed PostGIS geometry of projects and photos for QGIS.
+
+Projects store their location as latitude/longitude columns and their road
+as polyline_coordinates JSON, which a GIS cannot index. This module keeps a
+copy of each as a real PostGIS geometry in plain tables with GiST indexes:
+
+    projects_roadproject_point_geom   project centre points
+    projects_roadproject_line_geom    project polylines
+    projects_projectphoto_point_geom  photo locations
+
+Statement-level triggers on the source tables re-derive the geometry of the
+rows an INSERT, UPDATE (of the location columns only) or DELETE touched, in
+the writing transaction, so bulk writes are one set-based refresh and edits
+made outside Django (psql, QGIS attribute edits) are picked up as well.
+
+The views QGIS connects to keep their original names and columns and join
+the geometry tables to the source rows, so a viewport query is a GiST index
+scan followed by primary key lookups.
+
+install() is idempotent and rebuild() refills every table from scratch; the
+migration runs both when the PostGIS extension is installed and
+rebuild_geometry_layer does so on demand. Creating the extension needs a
+superuser, so it is left to the database administrator (CREATE EXTENSION
+postgis). The views read project columns, so a migration changing one of
+those must uninstall() first and install() again afterwards.
+"""
+from django.db import connection as default_connection
+
+GEOMETRY_TABLES = [
+    'projects_roadproject_point_geom',
+    'projects_roadproject_line_geom',
+    'projects_projectphoto_point_geom',
+]
+VIEWS = [
+    'projects_roadproject_points',
+    'projects_roadproject_polylines',
+    'projects_projectphoto_points',
+]
+# (source table, columns whose change moves the geometry, refresh function, trigger function)
+SOURCES = [
+    ('projects_roadproject', ['latitude', 'longitude', 'polyline_coordinates'],
+     'projects_refresh_roadproject_geom', 'projects_roadproject_geom_trigger'),
+    ('projects_projectphoto', ['latitude', 'longitude'],
+     'projects_refresh_projectphoto_geom', 'projects_projectphoto_geom_trigger'),
+]
+
+MISSING_EXTENSION = (
+    "The PostGIS extension is not installed in this database. As a superuser, run "
+    "CREATE EXTENSION postgis; then python manage.py rebuild_geometry_layer"
+)
+
+TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS projects_roadproject_point_geom (
+        id bigint PRIMARY KEY,
+        geom geometry(Point, 4326) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS projects_roadproject_line_geom (
+        id bigint PRIMARY KEY,
+        geom geometry(LineString, 4326) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS projects_projectphoto_point_geom (
+        id bigint PRIMARY KEY,
+        geom geometry(Point, 4326) NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS projects_roadproject_point_geom_gist ON projects_roadproject_point_geom USING GIST (geom)",
+    "CREATE INDEX IF NOT EXISTS projects_roadproject_line_geom_gist ON projects_roadproject_line_geom USING GIST (geom)",
+    "CREATE INDEX IF NOT EXISTS projects_projectphoto_point_geom_gist ON projects_projectphoto_point_geom USING GIST (geom)",
+]
+
+# Line through the valid vertices of a jsonb polyline, NULL with fewer than two. Mirrors
+# spatial.polyline_points(): vertices that are not a pair of numbers in range are skipped.
+# Also used by tiles.py; format with the polyline expression as {coordinates}
+POLYLINE_GEOM_SQL = """
+    SELECT CASE WHEN count(*) >= 2
+        THEN ST_SetSRID(ST_MakeLine(ST_MakePoint((c->>1)::float8, (c->>0)::float8) ORDER BY n), 4326)
+    END
+    FROM jsonb_array_elements(CASE WHEN jsonb_typeof({coordinates}) = 'array' THEN {coordinates} ELSE '[]' END)
+        WITH ORDINALITY AS vertex(c, n)
+    WHERE CASE WHEN jsonb_typeof(c->0) = 'number' AND jsonb_typeof(c->1) = 'number'
+        THEN (c->>0)::float8 BETWEEN -90 AND 90 AND (c->>1)::float8 BETWEEN -180 AND 180
+        ELSE false
+    END
+"""
+
+POLYLINE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION projects_polyline_geom(coordinates jsonb) RETURNS geometry
+LANGUAGE sql IMMUTABLE AS $$%s$$
+""" % POLYLINE_GEOM_SQL.format(coordinates='coordinates')
+
+REFRESH_FUNCTIONS_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION projects_refresh_roadproject_geom(ids bigint[]) RETURNS void
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF cardinality(ids) = 0 THEN
+            RETURN;
+        END IF;
+        DELETE FROM projects_roadproject_point_geom WHERE id = ANY(ids);
+        DELETE FROM projects_roadproject_line_geom WHERE id = ANY(ids);
+        INSERT INTO projects_roadproject_point_geom (id, geom)
+            SELECT p.id, ST_SetSRID(ST_MakePoint(p.longitude, p.latitude), 4326)
+            FROM projects_roadproject p
+            WHERE p.id = ANY(ids) AND p.latitude IS NOT NULL AND p.longitude IS NOT NULL;
+        INSERT INTO projects_roadproject_line_geom (id, geom)
+            SELECT lines.id, lines.geom FROM (
+                SELECT p.id, projects_polyline_geom(p.polyline_coordinates) AS geom
+                FROM projects_roadproject p WHERE p.id = ANY(ids)
+            ) lines
+            WHERE lines.geom IS NOT NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION projects_refresh_projectphoto_geom(ids bigint[]) RETURNS void
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF cardinality(ids) = 0 THEN
+            RETURN;
+        END IF;
+        DELETE FROM projects_projectphoto_point_geom WHERE id = ANY(ids);
+        INSERT INTO projects_projectphoto_point_geom (id, geom)
+            SELECT ph.id, ST_SetSRID(ST_MakePoint(ph.longitude, ph.latitude), 4326)
+            FROM projects_projectphoto ph
+            WHERE ph.id = ANY(ids) AND ph.latitude IS NOT NULL AND ph.longitude IS NOT NULL;
+    END
+    $$
+    """,
+]
+
+# Transition tables hold every row a statement touched; only rows whose location moved are refreshed
+TRIGGER_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION {function}() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM {refresh}(ARRAY(SELECT id FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM {refresh}(ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE ({new_columns}) IS DISTINCT FROM ({old_columns})
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM {refresh}(ARRAY(SELECT id FROM old_rows));
+    ELSE
+        {truncate}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS {table}_geom_insert ON {table};
+DROP TRIGGER IF EXISTS {table}_geom_update ON {table};
+DROP TRIGGER IF EXISTS {table}_geom_delete ON {table};
+DROP TRIGGER IF EXISTS {table}_geom_truncate ON {table};
+CREATE TRIGGER {table}_geom_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+CREATE TRIGGER {table}_geom_update AFTER UPDATE ON {table}
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+CREATE TRIGGER {table}_geom_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+CREATE TRIGGER {table}_geom_truncate AFTER TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+"""
+
+VIEWS_SQL = [
+    "DROP VIEW IF EXISTS projects_roadproject_points",
+    """
+    CREATE VIEW projects_roadproject_points AS
+    SELECT p.id, p.name, p.description, p.status, p.priority, p.budget, p.start_date, p.end_date,
+        p.created_at, p.updated_at, p.created_by_id, p.polyline_color, g.geom
+    FROM projects_roadproject_point_geom g JOIN projects_roadproject p ON p.id = g.id
+    """,
+    "DROP VIEW IF EXISTS projects_roadproject_polylines",
+    """
+    CREATE VIEW projects_roadproject_polylines AS
+    SELECT p.id, p.name, p.description, p.status, p.priority, p.budget, p.start_date, p.end_date,
+        p.created_at, p.updated_at, p.created_by_id, p.polyline_color, p.polyline_length_km, g.geom
+    FROM projects_roadproject_line_geom g JOIN projects_roadproject p ON p.id = g.id
+    """,
+    "DROP VIEW IF EXISTS projects_projectphoto_points",
+    """
+    CREATE VIEW projects_projectphoto_points AS
+    SELECT ph.id, ph.title, ph.description, ph.taken_at, ph.project_id, ph.uploaded_by_id, g.geom
+    FROM projects_projectphoto_point_geom g JOIN projects_projectphoto ph ON ph.id = g.id
+    """,
+]
+
+REBUILD_SQL = [
+    "TRUNCATE projects_roadproject_point_geom, projects_roadproject_line_geom, projects_projectphoto_point_geom",
+    """
+    INSERT INTO projects_roadproject_point_geom (id, geom)
+    SELECT id, ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) FROM projects_roadproject
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+    """
+    INSERT INTO projects_roadproject_line_geom (id, geom)
+    SELECT lines.id, lines.geom FROM (
+        SELECT id, projects_polyline_geom(polyline_coordinates) AS geom FROM projects_roadproject
+    ) lines
+    WHERE lines.geom IS NOT NULL
+    """,
+    """
+    INSERT INTO projects_projectphoto_point_geom (id, geom)
+    SELECT id, ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) FROM projects_projectphoto
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+    "ANALYZE projects_roadproject_point_geom, projects_roadproject_line_geom, projects_projectphoto_point_geom",
+]
+
+
+def _trigger_sql(table, columns, refresh, function, truncate_tables):
+    return TRIGGER_FUNCTION_SQL.format(
+        function=function, refresh=refresh,
+        new_columns=', '.join(f'n.{column}' for column in columns),
+        old_columns=', '.join(f'o.{column}' for column in columns),
+        truncate=' '.join(f'DELETE FROM {name};' for name in truncate_tables),
+    ), TRIGGERS_SQL.format(table=table, function=function)
+
+
+def install_sql():
+    """Statements creating or updating the tables, functions, triggers and views, in order"""
+    statements = TABLES_SQL + [POLYLINE_FUNCTION_SQL] + REFRESH_FUNCTIONS_SQL
+    for table, columns, refresh, function in SOURCES:
+        targets = [name for name in GEOMETRY_TABLES if name.startswith(table + '_')]
+        statements.extend(_trigger_sql(table, columns, refresh, function, targets))
+    return statements + VIEWS_SQL
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def available(connection=default_connection):
+    """Whether the database is PostgreSQL with the PostGIS extension installed"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        # Installed, not merely available: only a superuser can create it, which the app role usually is not
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        return cursor.fetchone() is not None
+
+
+def installed(connection=default_connection):
+    """Whether the geometry tables exist in the database"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('projects_roadproject_line_geom') IS NOT NULL")
+        return cursor.fetchone()[0]
+
+
+def install(connection=default_connection):
+    _execute(connection, install_sql())
+
+
+def rebuild(connection=default_connection):
+    """Refill every geometry table from the source tables"""
+    _execute(connection, REBUILD_SQL)
+
+
+def uninstall(connection=default_connection):
+    statements = [f'DROP VIEW IF EXISTS {name}' for name in VIEWS]
+    for table, _, refresh, function in SOURCES:
+        statements += [
+            f'DROP TRIGGER IF EXISTS {table}_geom_{event} ON {table}'
+            for event in ('insert', 'update', 'delete', 'truncate')
+        ]
+        statements += [f'DROP FUNCTION IF EXISTS {function}()', f'DROP FUNCTION IF EXISTS {refresh}(bigint[])']
+    statements.append('DROP FUNCTION IF EXISTS projects_polyline_geom(jsonb)')
+    statements += [f'DROP TABLE IF EXISTS {name}' for name in GEOMETRY_TABLES]
+    _execute(connection, statements)
+
+
+def counts(connection=default_connection):
+    """{geometry table: row count}"""
+    with connection.cursor() as cursor:
+        result = {}
+        for name in GEOMETRY_TABLES:
+            cursor.execute(f'SELECT count(*) FROM {name}')
+            result[name] = cursor.fetchone()[0]
+    return result
@@ -0,0 +1,77 @@
+"""
+Photo decoding work for the background pipeline: EXIF GPS extraction and
+resized JPEG/WebP variants.
+
+Pure Pillow with no Django imports, so it can run in a process pool
+started with "spawn" (bytes in, bytes out).
+"""
+import io
+
+from PIL import Image, ImageOps
+
+GPS_IFD = 0x8825
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def _degrees(dms):
+    degrees, minutes, seconds = (float(value) for value in dms)
+    return degrees + minutes / 60.0 + seconds / 3600.0
+
+
+def gps_coordinates(exif):
+    """Return (lat, lng) from an Image.Exif's GPS block, or None"""
+    try:
+        gps = exif.get_ifd(GPS_IFD)
+        lat = _degrees(gps[GPS_LATITUDE])
+        lng = _degrees(gps[GPS_LONGITUDE])
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if str(gps.get(GPS_LATITUDE_REF, 'N')).upper().startswith('S'):
+        lat = -lat
+    if str(gps.get(GPS_LONGITUDE_REF, 'E')).upper().startswith('W'):
+        lng = -lng
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0) or (lat == 0.0 and lng == 0.0):
+        return None
+    return lat, lng
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def render(data, sizes):
+    """
+    Decode an uploaded image and build its variants.
+
+    sizes are longest-edge pixel bounds; variants never upscale. Returns
+    {'width', 'height', 'gps', 'variants': {size: {'width', 'height',
+    'jpeg': bytes, 'webp': bytes}}}.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        gps = gps_coordinates(image.getexif())
+        # Phones store rotation in EXIF; bake it in since variants drop the tag
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        width, height = image.size
+        variants = {}
+        for size in sorted(sizes, reverse=True):
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            variants[size] = {
+                'width': variant.width,
+                'height': variant.height,
+                'jpeg': _encode(variant, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True),
+                'webp': _encode(variant, 'WEBP', quality=WEBP_QUALITY, method=4),
+            }
+            # Smaller sizes resample from the previous variant rather than the original
+            image = variant
+    return {'width': width, 'height': height, 'gps': gps, 'variants': variants}
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from projects.geometry import batch_metrics
+from projects.models import POLYLINE_METRIC_FIELDS, RoadProject
+from projects.signals import bulk_saved
+
+
+class Command(BaseCommand):
+    help = "Compute the geodesic length, vertex count and centroid of every project polyline, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Number of projects measured and written per batch")
+        parser.add_argument('--missing', action='store_true',
+                            help="Only projects with a polyline whose length was never computed")
+
+    def update_sql(self):
+        quote = connection.ops.quote_name
+        # updated_at too, so sync clients fetch the new metrics and cached fragments are retired
+        columns = ', '.join(f'{quote(name)} = %s' for name in [*POLYLINE_METRIC_FIELDS, 'updated_at'])
+        return f'UPDATE {quote(RoadProject._meta.db_table)} SET {columns} WHERE {quote("id")} = %s'
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        projects = RoadProject.objects.order_by('id')
+        if options['missing']:
+            projects = projects.filter(polyline_coordinates__isnull=False, polyline_length_km__isnull=True)
+        # bulk_update's CASE expressions cost more to build than the metrics; one prepared UPDATE per row instead
+        sql = self.update_sql()
+        last_id = 0
+        total = 0
+        while True:
+            # Keyset batches: each one is a short query however far the backfill has got
+            rows = list(projects.filter(id__gt=last_id).values_list('id', 'polyline_coordinates')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            params = []
+            project = RoadProject()
+            updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+            for (project_id, _), metrics in zip(rows, batch_metrics([coordinates for _, coordinates in rows])):
+                project.set_polyline_metrics(metrics)
+                params.append([getattr(project, name) for name in POLYLINE_METRIC_FIELDS] + [updated_at, project_id])
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, params)
+            total += len(rows)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{total} projects measured (up to id {last_id})")
+        # Bumps the projects version, retiring cached responses and tiles
+        bulk_saved.send(sender=RoadProject, instances=[], created=False)
+        self.stdout.write(self.style.SUCCESS(f"Measured {total} project polylines"))
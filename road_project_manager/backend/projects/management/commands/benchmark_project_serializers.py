@@ -0,0 +1,110 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from projects import fastpath
+from projects.models import RoadProject
+from projects.renderers import ORJSONRenderer
+from projects.serializers import RoadProjectSerializer
+from projects.simplify import tolerance_for_zoom
+
+VARIANTS = {
+    'json': {},
+    'encoded': {'geometry_format': 'encoded'},
+    'zoom 8': {'polyline_tolerance': tolerance_for_zoom(8)},
+}
+
+
+class Command(BaseCommand):
+    help = ("Compare RoadProjectSerializer + JSONRenderer with the fast path + ORJSONRenderer: "
+            "check the output is identical and time both")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help="Benchmark N generated projects inside a transaction that is rolled back")
+        parser.add_argument('--limit', type=int, default=1000,
+                            help="Number of projects serialized per run")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Runs per path; the best time is reported")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['synthetic']:
+                self.create_projects(options['synthetic'])
+            self.run(options['limit'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def create_projects(self, count):
+        rng = random.Random(42)
+        users = [User.objects.create(username=f'benchmark_user_{i}') for i in range(10)]
+        projects = []
+        for i in range(count):
+            lat, lng = rng.uniform(-40, 40), rng.uniform(-120, 120)
+            polyline = []
+            for _ in range(rng.randint(2, 400)):
+                lat += rng.uniform(-0.002, 0.002)
+                lng += rng.uniform(-0.002, 0.002)
+                polyline.append([round(lat, 6), round(lng, 6)])
+            project = RoadProject(
+                name=f'Benchmark road {i}', description='Generated for benchmarking',
+                status=rng.choice(['planned', 'in_progress', 'completed', 'on_hold']),
+                budget=Decimal(rng.randint(0, 10 ** 8)) / 100 if i % 3 else None,
+                start_date=date(2024, 1, 1) + timedelta(days=i % 365) if i % 2 else None,
+                created_by=rng.choice(users), latitude=lat, longitude=lng,
+                polyline_coordinates=polyline,
+            )
+            project.refresh_derived_fields()
+            projects.append(project)
+        RoadProject.objects.bulk_create(projects, batch_size=500)
+        through = RoadProject.assigned_to.through
+        through.objects.bulk_create([
+            through(roadproject_id=project.pk, user_id=user.pk)
+            for project in projects
+            for user in rng.sample(users, rng.randint(0, 3))
+        ])
+
+    def serializer_path(self, queryset, context):
+        queryset = queryset.select_related('created_by').prefetch_related(
+            Prefetch('assigned_to', queryset=User.objects.order_by('id'))
+        )
+        # The child serializer directly, so the fragment cache does not flatter the timing
+        serializer = RoadProjectSerializer(context=context)
+        return JSONRenderer().render([serializer.to_representation(project) for project in queryset])
+
+    def fast_path(self, queryset, context):
+        return ORJSONRenderer().render(fastpath.represent(fastpath.rows(queryset, context), context))
+
+    def timed(self, function, repeat, *args):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = function(*args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
+
+    def run(self, limit, repeat):
+        ids = list(RoadProject.objects.order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            raise CommandError("No projects to serialize; pass --synthetic N")
+        queryset = RoadProject.objects.filter(id__in=ids).order_by('id')
+        self.stdout.write(f"{len(ids)} projects, best of {repeat} runs")
+
+        for name, context in VARIANTS.items():
+            expected, slow = self.timed(self.serializer_path, repeat, queryset, context)
+            actual, fast = self.timed(self.fast_path, repeat, queryset, context)
+            if json.loads(expected) != json.loads(actual):
+                raise CommandError(f"{name}: fast path output differs from RoadProjectSerializer")
+            self.stdout.write(
+                f"{name:>8}: serializer {slow * 1000:8.1f} ms  fast {fast * 1000:8.1f} ms  "
+                f"x{slow / fast:.1f}  ({len(actual)} bytes, identical)"
+            )
+        self.stdout.write(self.style.SUCCESS("Fast path output matches RoadProjectSerializer"))
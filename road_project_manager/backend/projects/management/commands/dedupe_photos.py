@@ -0,0 +1,61 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects import storage, versions
+from projects.models import ProjectPhoto
+
+
+class Command(BaseCommand):
+    help = ("Move photos stored before content addressing to their content-hash names, "
+            "so identical images share one file, and delete the copies this frees")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only hash the files and report what would be freed")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        seen = set()
+        moved = duplicates = freed = missing = 0
+        photos = ProjectPhoto.objects.exclude(image='').order_by('id').values_list('id', 'image')
+        for photo_id, name in photos.iterator():
+            if storage.hash_from_name(name):
+                seen.add(name)
+                continue
+            try:
+                with storage.photo_storage.open(name) as stored:
+                    content = File(stored)
+                    digest = content.content_hash = storage.content_hash(content)
+                    target = storage.blob_name(
+                        os.path.dirname(name), digest, os.path.splitext(name)[1]
+                    )
+                    duplicate = target in seen or storage.photo_storage.exists(target)
+                    size = storage.photo_storage.size(name)
+                    if not dry_run and not duplicate:
+                        storage.photo_storage.save(name, content)
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Photo {photo_id}: {name} is missing")
+                continue
+            seen.add(target)
+            moved += 1
+            if duplicate:
+                duplicates += 1
+                freed += size
+            if not dry_run:
+                ProjectPhoto.objects.filter(pk=photo_id).update(
+                    image=target, content_hash=digest, updated_at=timezone.now()
+                )
+                storage.release(name)
+        if moved and not dry_run:
+            # Queryset updates send no signals; let ETags and sync clients see the new URLs
+            versions.bump('photos')
+
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} photos to content-addressed names: {duplicates} duplicate files, "
+            f"{freed / (1024 * 1024):.1f} MB freed, {missing} missing"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from projects import photo_pipeline
+from projects.models import ProjectPhoto
+
+
+class Command(BaseCommand):
+    help = ("Run the photo pipeline inline for photos that are still pending, were interrupted "
+            "or failed (e.g. after a restart dropped the in-memory queue)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Reprocess every photo, e.g. after changing PHOTO_VARIANT_SIZES")
+
+    def handle(self, *args, **options):
+        photos = ProjectPhoto.objects.order_by('id')
+        if not options['all']:
+            photos = photos.exclude(processing_status='done')
+        counts = {}
+        for photo_id in photos.values_list('id', flat=True).iterator():
+            status = photo_pipeline.process(photo_id) or 'skipped'
+            counts[status] = counts.get(status, 0) + 1
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items())) or "nothing to do"
+        self.stdout.write(self.style.SUCCESS(f"Processed photos: {summary}"))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.models import PhotoUpload
+
+
+class Command(BaseCommand):
+    help = "Delete chunked photo uploads idle for PHOTO_UPLOAD_EXPIRY_HOURS, with their staged files"
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.PHOTO_UPLOAD_EXPIRY_HOURS)
+        # Model deletes, so the post_delete receiver removes each staging file
+        deleted, _ = PhotoUpload.objects.filter(updated_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} photo uploads"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from projects import geometry_layer
+
+
+class Command(BaseCommand):
+    help = ("Create or update the indexed PostGIS geometry tables, triggers and views QGIS reads, "
+            "and refill them from the project and photo tables")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The geometry layer needs PostgreSQL with the PostGIS extension")
+        if not geometry_layer.available():
+            raise CommandError(geometry_layer.MISSING_EXTENSION)
+        with transaction.atomic():
+            geometry_layer.install()
+            geometry_layer.rebuild()
+        for name, count in geometry_layer.counts().items():
+            self.stdout.write(f"{name}: {count} rows")
+        self.stdout.write(self.style.SUCCESS("Rebuilt the geometry layer"))
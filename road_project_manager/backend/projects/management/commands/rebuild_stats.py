@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from projects import rollups
+from projects.models import StatsRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard stats rollup table from the project and segment tables"
+
+    def handle(self, *args, **options):
+        rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {StatsRollup.objects.count()} stats rollup rows"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from projects import fragments
+from projects.models import RoadProject
+from projects.signals import bulk_saved
+from projects.simplify import build_levels
+
+
+class Command(BaseCommand):
+    help = "Recompute the simplified polyline levels for every road project"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of projects written per bulk update")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        projects = RoadProject.objects.only('id', 'polyline_coordinates', 'polyline_levels')
+        batch = []
+        total = 0
+        for project in projects.iterator(chunk_size=batch_size):
+            project.polyline_levels = build_levels(project.polyline_coordinates) or None
+            batch.append(project)
+            if len(batch) >= batch_size:
+                RoadProject.objects.bulk_update(batch, ['polyline_levels'])
+                total += len(batch)
+                batch = []
+        if batch:
+            RoadProject.objects.bulk_update(batch, ['polyline_levels'])
+            total += len(batch)
+        # Zoomed listings and tiles serve the levels, so their caches are stale now;
+        # updated_at is left alone, so cached project fragments are dropped wholesale
+        bulk_saved.send(sender=RoadProject, instances=[], created=False)
+        fragments.fragment_cache().clear()
+        self.stdout.write(self.style.SUCCESS(f"Simplified {total} project polylines"))
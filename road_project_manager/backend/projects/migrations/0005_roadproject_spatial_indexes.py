@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_remove_roadsegment_end_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roadproject',
+            index=models.Index(fields=['latitude', 'longitude'], name='roadproject_lat_lng_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadproject',
+            index=models.Index(fields=['updated_at'], name='roadproject_updated_idx'),
+        ),
+    ]
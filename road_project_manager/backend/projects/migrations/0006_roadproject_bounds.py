@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:21
+
+from django.db import migrations, models
+
+from projects.spatial import coordinate_bounds, project_points
+
+
+def fill_bounds(apps, schema_editor):
+    RoadProject = apps.get_model('projects', 'RoadProject')
+    batch = []
+    for project in RoadProject.objects.only('id', 'latitude', 'longitude', 'polyline_coordinates').iterator(chunk_size=2000):
+        points = project_points(project.latitude, project.longitude, project.polyline_coordinates)
+        bounds = coordinate_bounds(points)
+        if bounds is None:
+            continue
+        project.bbox_min_lat, project.bbox_min_lng, project.bbox_max_lat, project.bbox_max_lng = bounds
+        batch.append(project)
+        if len(batch) >= 2000:
+            RoadProject.objects.bulk_update(batch, ['bbox_min_lat', 'bbox_min_lng', 'bbox_max_lat', 'bbox_max_lng'])
+            batch = []
+    if batch:
+        RoadProject.objects.bulk_update(batch, ['bbox_min_lat', 'bbox_min_lng', 'bbox_max_lat', 'bbox_max_lng'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_roadproject_spatial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadproject',
+            name='bbox_max_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='bbox_max_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='bbox_min_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='bbox_min_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='roadproject',
+            index=models.Index(fields=['bbox_min_lat', 'bbox_max_lat'], name='roadproject_bbox_lat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadproject',
+            index=models.Index(fields=['bbox_min_lng', 'bbox_max_lng'], name='roadproject_bbox_lng_idx'),
+        ),
+        migrations.RunPython(fill_bounds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_roadproject_bounds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_levels',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
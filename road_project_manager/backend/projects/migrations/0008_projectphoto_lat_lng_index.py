@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_roadproject_polyline_levels'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectphoto',
+            index=models.Index(fields=['latitude', 'longitude'], name='projectphoto_lat_lng_idx'),
+        ),
+    ]
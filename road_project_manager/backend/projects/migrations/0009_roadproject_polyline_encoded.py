@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:27
+
+from django.db import migrations, models
+
+from projects import polyline
+from projects.spatial import polyline_points
+
+
+def encode_polylines(apps, schema_editor):
+    RoadProject = apps.get_model('projects', 'RoadProject')
+    batch = []
+    projects = RoadProject.objects.exclude(polyline_coordinates=None).only('id', 'polyline_coordinates')
+    for project in projects.iterator(chunk_size=2000):
+        points = list(polyline_points(project.polyline_coordinates))
+        if not points:
+            continue
+        project.polyline_encoded = polyline.encode(points)
+        batch.append(project)
+        if len(batch) >= 2000:
+            RoadProject.objects.bulk_update(batch, ['polyline_encoded'])
+            batch = []
+    if batch:
+        RoadProject.objects.bulk_update(batch, ['polyline_encoded'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_projectphoto_lat_lng_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_encoded',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(encode_polylines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_roadproject_polyline_encoded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectphoto',
+            index=models.Index(fields=['taken_at', 'id'], name='projectphoto_taken_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectupdate',
+            index=models.Index(fields=['created_at', 'id'], name='projectupdate_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadproject',
+            index=models.Index(fields=['created_at', 'id'], name='roadproject_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadsegment',
+            index=models.Index(fields=['name', 'id'], name='roadsegment_name_id_idx'),
+        ),
+    ]
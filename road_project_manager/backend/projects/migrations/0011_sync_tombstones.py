@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='projectphoto',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='projectupdate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='projectphoto',
+            index=models.Index(fields=['updated_at', 'id'], name='projectphoto_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectupdate',
+            index=models.Index(fields=['updated_at', 'id'], name='projectupdate_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadsegment',
+            index=models.Index(fields=['updated_at', 'id'], name='roadsegment_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ),
+    ]
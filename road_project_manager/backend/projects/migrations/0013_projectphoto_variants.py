@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_collection_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectphoto',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='projectphoto',
+            name='variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized JPEG/WebP copies keyed by size', null=True),
+        ),
+    ]
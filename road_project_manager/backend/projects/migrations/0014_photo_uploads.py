@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0013_projectphoto_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(help_text='Total file size in bytes')),
+                ('sha256', models.CharField(blank=True, help_text='Expected SHA-256, checked when finalizing', max_length=64)),
+                ('received', models.BigIntegerField(default=0, help_text='Bytes stored so far; the next chunk starts here')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='projectphoto',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the image file', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='projectphoto',
+            index=models.Index(fields=['content_hash', 'project'], name='projectphoto_hash_idx'),
+        ),
+        migrations.AddField(
+            model_name='photoupload',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='photoupload',
+            name='photo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.projectphoto'),
+        ),
+        migrations.AddField(
+            model_name='photoupload',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_uploads', to='projects.roadproject'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:52
+
+from django.db import migrations, models
+import projects.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_photo_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectphoto',
+            name='image',
+            field=models.ImageField(storage=projects.storage.ContentAddressedStorage(), upload_to='project_photos/'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+from projects.spatial import mercator_cell
+
+GRID_ZOOM = 22
+
+
+def fill_grid_cells(apps, schema_editor):
+    ProjectPhoto = apps.get_model('projects', 'ProjectPhoto')
+    photos = ProjectPhoto.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for photo in photos.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        photo.grid_x, photo.grid_y = mercator_cell(photo.latitude, photo.longitude, GRID_ZOOM)
+        batch.append(photo)
+        if len(batch) >= 2000:
+            ProjectPhoto.objects.bulk_update(batch, ['grid_x', 'grid_y'])
+            batch = []
+    if batch:
+        ProjectPhoto.objects.bulk_update(batch, ['grid_x', 'grid_y'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_content_addressed_photos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectphoto',
+            name='grid_x',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectphoto',
+            name='grid_y',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='projectphoto',
+            index=models.Index(fields=['grid_x', 'grid_y'], name='projectphoto_grid_idx'),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
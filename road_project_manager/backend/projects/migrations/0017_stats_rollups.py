@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+from projects import rollups
+
+
+def fill_rollups(apps, schema_editor):
+    StatsRollup = apps.get_model('projects', 'StatsRollup')
+    for label in rollups.ROLLUPS:
+        rollups.replace(StatsRollup, label, apps.get_model(label).objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_photo_grid_cells'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=30)),
+                ('key', models.CharField(blank=True, max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+            ],
+            options={
+                'ordering': ['dimension', 'key'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='statsrollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='statsrollup_dimension_key_uniq'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
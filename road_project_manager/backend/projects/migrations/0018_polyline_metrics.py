@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_centroid_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_centroid_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_length_km',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadproject',
+            name='polyline_vertex_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:20
+
+from django.db import migrations
+
+from projects import geometry_layer
+
+
+def install_geometry_layer(apps, schema_editor):
+    # Indexed geometry for QGIS; skipped on SQLite and on PostgreSQL without the PostGIS extension,
+    # where rebuild_geometry_layer explains what to install and creates it later
+    if geometry_layer.available(schema_editor.connection):
+        geometry_layer.install(schema_editor.connection)
+        geometry_layer.rebuild(schema_editor.connection)
+
+
+def remove_geometry_layer(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        geometry_layer.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_polyline_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_geometry_layer, remove_geometry_layer),
+    ]
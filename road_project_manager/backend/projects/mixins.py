@@ -0,0 +1,388 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+
+from . import versions
+from .serializers import BulkPrimaryKeyRelatedField
+from .signals import bulk_saved
+
+
+class NotModified(Exception):
+    """Raised from initial() to answer a conditional GET with 304 before the handler runs"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag and Last-Modified headers on GET responses, derived from the
+    version counters of the collections the response is built from.
+
+    A request whose If-None-Match (or If-Modified-Since) still matches gets
+    a 304 straight after authentication, without querying or serializing.
+    """
+    version_collections = []
+    # Per-action overrides, e.g. nested actions listing another collection
+    action_version_collections = {}
+
+    def get_version_collections(self):
+        return self.action_version_collections.get(self.action, self.version_collections)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.version_etag = self.version_last_modified = None
+        self.version_current = {}
+        collections = self.get_version_collections()
+        if request.method not in ('GET', 'HEAD') or not collections:
+            return
+        current, last_modified = versions.current(collections)
+        # Handlers caching data key it on these, so the body matches the ETag
+        self.version_current = current
+        # The representation depends on the URL (filters, page, zoom, host of media links) and the format
+        self.version_etag = versions.etag(current, request.build_absolute_uri(), request.accepted_media_type or '')
+        self.version_last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=self.version_etag, last_modified=self.version_last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'version_etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if self.version_last_modified is not None:
+                response['Last-Modified'] = http_date(self.version_last_modified)
+            # Let clients keep the body but revalidate before every use
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class RelatedQuerysetMixin:
+    """
+    Join the relations a serializer reads so list/detail responses run a
+    constant number of queries instead of one (or two) per row.
+    """
+    select_related_fields = []
+    prefetch_related_fields = []
+    # Actions that never serialize rows from this viewset's queryset
+    unrelated_actions = ['destroy']
+
+    def get_select_related_fields(self):
+        return self.select_related_fields
+
+    def get_prefetch_related_fields(self):
+        return self.prefetch_related_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.unrelated_actions:
+            return queryset
+        select_related_fields = self.get_select_related_fields()
+        prefetch_related_fields = self.get_prefetch_related_fields()
+        if select_related_fields:
+            queryset = queryset.select_related(*select_related_fields)
+        if prefetch_related_fields:
+            queryset = queryset.prefetch_related(*prefetch_related_fields)
+        return queryset
+
+
+class SparseFieldsetMixin(RelatedQuerysetMixin):
+    """
+    ?fields=a,b / ?omit=c on read actions: the serializer drops the other
+    fields, and the queryset loads only the columns they read and skips
+    joins and prefetches nothing needs.
+    """
+    sparse_actions = ['list', 'retrieve']
+
+    def get_sparse_fieldset(self):
+        """Return (requested names or None, omitted names) for this request"""
+        if not hasattr(self, '_sparse_fieldset'):
+            self._sparse_fieldset = (None, set())
+            params = self.request.query_params if self.request is not None else {}
+            fields = [name for name in params.get('fields', '').split(',') if name]
+            omit = [name for name in params.get('omit', '').split(',') if name]
+            if self.action in self.sparse_actions and (fields or omit):
+                known = self.get_serializer_class()().fields
+                unknown = [name for name in fields + omit if name not in known]
+                if unknown:
+                    raise ValidationError({'error': f"Unknown fields: {', '.join(unknown)}"})
+                self._sparse_fieldset = (set(fields) or None, set(omit))
+        return self._sparse_fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, omit = self.get_sparse_fieldset()
+        if fields is not None or omit:
+            context['sparse_fields'] = fields
+            context['sparse_omit'] = omit
+        return context
+
+    def get_sparse_query(self):
+        if not hasattr(self, '_sparse_query'):
+            fields, omit = self.get_sparse_fieldset()
+            sparse = fields is not None or omit
+            self._sparse_query = self.get_serializer().sparse_query() if sparse else None
+        return self._sparse_query
+
+    def get_select_related_fields(self):
+        fields = super().get_select_related_fields()
+        query = self.get_sparse_query()
+        return fields if query is None else [name for name in fields if name in query[1]]
+
+    def get_prefetch_related_fields(self):
+        lookups = super().get_prefetch_related_fields()
+        query = self.get_sparse_query()
+        if query is None:
+            return lookups
+        return [lookup for lookup in lookups if getattr(lookup, 'prefetch_to', lookup) in query[2]]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        query = self.get_sparse_query()
+        if query is None or self.action in self.unrelated_actions:
+            return queryset
+        selected = set(self.get_select_related_fields())
+        # Columns across a relation can only be limited when that relation is joined
+        only = {name for name in query[0] if '__' not in name or name.split('__')[0] in selected}
+        # Cursor pagination reads the ordering columns from the last row
+        only.update(name.lstrip('-') for name in queryset.query.order_by or queryset.model._meta.ordering)
+        return queryset.only(*only)
+
+
+class ResponseCacheMixin:
+    """
+    Cache serialized response data for the listed actions in the "responses" cache.
+
+    Keys are the ETag computed by ConditionalGetMixin, which already covers
+    the collection versions, the full URL (filters, cursor, page size) and
+    the negotiated format, so any change to the collection moves readers
+    to new keys and stale pages simply age out of the cache.
+    """
+    response_cache_actions = ['list']
+
+    def get_response_cache_key(self):
+        etag = getattr(self, 'version_etag', None)
+        if etag is None or self.action not in self.response_cache_actions:
+            return None
+        return f'responses:{type(self).__name__}:{etag[1:-1]}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key()
+        if key is None:
+            return handler(request, *args, **kwargs)
+        cache = caches['responses']
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 600))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class BulkMixin:
+    """
+    Adds a `bulk` action to a ModelViewSet:
+
+    POST   <prefix>/bulk/   list of objects to create
+    PATCH  <prefix>/bulk/   list of partial objects, each with its "id"
+    DELETE <prefix>/bulk/   {"ids": [...]}
+
+    Every item is validated before anything is written; if any item fails,
+    nothing is saved and the errors come back keyed by item index.
+    Writes use bulk_create/bulk_update inside one transaction.
+    """
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def get_bulk_create_kwargs(self):
+        """Extra attributes set on every created instance (e.g. the creating user)"""
+        return {}
+
+    def prepare_bulk_instance(self, instance):
+        """Hook for work save() normally does; returns extra field names to write"""
+        return []
+
+    def _bulk_items(self, data):
+        if not isinstance(data, list):
+            raise ValidationError({'error': 'Expected a list of objects'})
+        if len(data) > self.bulk_max_items:
+            raise ValidationError({'error': f'At most {self.bulk_max_items} items per request'})
+        return data
+
+    def _bulk_lookup(self, items):
+        """Preload every related object the items reference, one query per relation"""
+        lookup = {}
+        for name, field in self.get_serializer().fields.items():
+            if field.read_only:
+                continue
+            relation = getattr(field, 'child_relation', field)
+            if not isinstance(relation, BulkPrimaryKeyRelatedField):
+                continue
+            keys = set()
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if isinstance(value, list) else [value]
+                keys.update(str(key) for key in values if isinstance(key, (int, str)))
+            queryset = relation.get_queryset()
+            valid_keys = [key for key in keys if key.isdigit()]
+            found = lookup.setdefault(queryset.model, {})
+            found.update((str(pk), obj) for pk, obj in queryset.in_bulk(valid_keys).items())
+        return lookup
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['bulk_lookup'] = getattr(self, 'bulk_lookup', {})
+        return context
+
+    @staticmethod
+    def _indexed_errors(errors):
+        return [{'index': index, 'errors': error} for index, error in enumerate(errors) if error]
+
+    def _touch_auto_now(self, instance, fields):
+        now = timezone.now()
+        for field in instance._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                setattr(instance, field.attname, now)
+                fields.add(field.name)
+
+    @staticmethod
+    def _m2m_names(model):
+        return {field.name for field in model._meta.many_to_many}
+
+    def _bulk_set_m2m(self, model, instances, relations):
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            touched = [instance.pk for instance, rel in zip(instances, relations) if field.name in rel]
+            if not touched:
+                continue
+            through.objects.filter(**{f'{source}__in': touched}).delete()
+            rows = [
+                through(**{source: instance.pk, target: related.pk})
+                for instance, rel in zip(instances, relations)
+                for related in rel.get(field.name, [])
+            ]
+            through.objects.bulk_create(rows, batch_size=self.bulk_batch_size, ignore_conflicts=True)
+
+    def bulk_create(self, request):
+        items = self._bulk_items(request.data)
+        self.bulk_lookup = self._bulk_lookup(items)
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({'errors': self._indexed_errors(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        m2m_names = self._m2m_names(model)
+        extra = self.get_bulk_create_kwargs()
+        instances, relations = [], []
+        for data in serializer.validated_data:
+            data = dict(data, **extra)
+            relations.append({name: data.pop(name) for name in list(data) if name in m2m_names})
+            instance = model(**data)
+            self.prepare_bulk_instance(instance)
+            instances.append(instance)
+
+        with transaction.atomic():
+            model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+            self._bulk_set_m2m(model, instances, relations)
+            # Inside the transaction, so receivers' writes (stats rollups) commit or roll back with it
+            bulk_saved.send(sender=model, instances=instances, created=True)
+        return Response(
+            {'created': len(instances), 'ids': [instance.pk for instance in instances]},
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, request):
+        items = self._bulk_items(request.data)
+        # One transaction from loading the rows to the signals, with the rows locked, so
+        # receivers comparing against loaded values (stats rollups) see what is stored
+        with transaction.atomic():
+            return self._bulk_update(request, items)
+
+    def _bulk_update(self, request, items):
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        existing = self.get_queryset().select_for_update().in_bulk([pk for pk in ids if isinstance(pk, int)])
+        self.bulk_lookup = self._bulk_lookup(items)
+
+        model = self.get_queryset().model
+        m2m_names = self._m2m_names(model)
+        errors = [{} for _ in items]
+        instances, relations, fields = [], [], set()
+        # One partial serializer validates every item, so its fields are built once
+        validator = self.get_serializer(partial=True)
+        for index, (item, pk) in enumerate(zip(items, ids)):
+            instance = existing.get(pk)
+            if instance is None:
+                errors[index] = {'id': ['Missing or unknown id']}
+                continue
+            validator.instance = instance
+            try:
+                validated_data = validator.run_validation(item)
+            except ValidationError as exc:
+                errors[index] = as_serializer_error(exc)
+                continue
+            relation = {}
+            for name, value in validated_data.items():
+                if name in m2m_names:
+                    relation[name] = value
+                else:
+                    setattr(instance, name, value)
+                    fields.add(name)
+            fields.update(self.prepare_bulk_instance(instance))
+            self._touch_auto_now(instance, fields)
+            instances.append(instance)
+            relations.append(relation)
+
+        if any(errors):
+            return Response({'errors': self._indexed_errors(errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if fields:
+            model.objects.bulk_update(instances, sorted(fields), batch_size=self.bulk_batch_size)
+        self._bulk_set_m2m(model, instances, relations)
+        bulk_saved.send(sender=model, instances=instances, created=False)
+        return Response({'updated': len(instances), 'ids': [instance.pk for instance in instances]})
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'error': 'Expected {"ids": [<int>, ...]}'})
+        if len(ids) > self.bulk_max_items:
+            raise ValidationError({'error': f'At most {self.bulk_max_items} items per request'})
+        model = self.get_queryset().model
+        with transaction.atomic():
+            # Locked first, so the rows delete() collects hold the values receivers remove
+            list(self.get_queryset().filter(pk__in=ids).select_for_update().values_list('pk', flat=True))
+            _, deleted = self.get_queryset().filter(pk__in=ids).delete()
+        return Response({'deleted': deleted.get(model._meta.label, 0)})
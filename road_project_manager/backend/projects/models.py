@@ -1,6 +1,31 @@
-from django.db import models
+import copy
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
+from . import polyline
+from .geometry import polyline_metrics
+from .simplify import build_levels, select_level
+from .storage import hash_from_name, photo_storage
+from .spatial import coordinate_bounds, mercator_cell, polyline_points, project_points
+
+BOUNDS_FIELDS = ['bbox_min_lat', 'bbox_min_lng', 'bbox_max_lat', 'bbox_max_lng']
+GEOMETRY_SOURCE_FIELDS = {'latitude', 'longitude', 'polyline_coordinates'}
+POLYLINE_METRIC_FIELDS = ['polyline_length_km', 'polyline_vertex_count', 'polyline_centroid_lat', 'polyline_centroid_lng']
+PHOTO_GRID_ZOOM = 22
+PHOTO_LOCATION_FIELDS = {'latitude', 'longitude'}
+# Fields the dashboard rollups (rollups.py) are kept by
+PROJECT_ROLLUP_FIELDS = ('status', 'priority', 'budget')
+SEGMENT_ROLLUP_FIELDS = ('road_type', 'surface_type', 'length_km')
+_UNLOADED = object()
+
+
+def loaded_values(instance, names):
+    """Values of the named fields as loaded from the database, or None if any was deferred"""
+    values = tuple(instance.__dict__.get(name, _UNLOADED) for name in names)
+    return None if _UNLOADED in values else values
+
 
 class RoadProject(models.Model):
     STATUS_CHOICES = [
@@ -42,12 +67,98 @@ class RoadProject(models.Model):
     # Polyline color customization
     polyline_color = models.CharField(max_length=7, default='#3388ff', help_text="Hex color code for the polyline (e.g., #ff0000)")
 
+    # Bounding box of the polyline and centre point, maintained on save for viewport queries
+    bbox_min_lat = models.FloatField(null=True, blank=True, editable=False)
+    bbox_min_lng = models.FloatField(null=True, blank=True, editable=False)
+    bbox_max_lat = models.FloatField(null=True, blank=True, editable=False)
+    bbox_max_lng = models.FloatField(null=True, blank=True, editable=False)
+
+    # Douglas-Peucker simplified polylines keyed by zoom level, rebuilt when the polyline changes
+    polyline_levels = models.JSONField(null=True, blank=True, editable=False)
+
+    # Google encoded polyline copy of polyline_coordinates for compact transport
+    polyline_encoded = models.TextField(null=True, blank=True, editable=False)
+
+    # Geodesic length, vertex count and centroid of the polyline (see geometry.py), rebuilt when it changes
+    polyline_length_km = models.FloatField(null=True, blank=True, editable=False)
+    polyline_vertex_count = models.PositiveIntegerField(default=0, editable=False)
+    polyline_centroid_lat = models.FloatField(null=True, blank=True, editable=False)
+    polyline_centroid_lng = models.FloatField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='roadproject_lat_lng_idx'),
+            models.Index(fields=['updated_at'], name='roadproject_updated_idx'),
+            models.Index(fields=['created_at', 'id'], name='roadproject_created_id_idx'),
+            models.Index(fields=['bbox_min_lat', 'bbox_max_lat'], name='roadproject_bbox_lat_idx'),
+            models.Index(fields=['bbox_min_lng', 'bbox_max_lng'], name='roadproject_bbox_lng_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__.get('polyline_coordinates', _UNLOADED)
+        # A copy: the JSON list can be changed in place, which must still count as a change
+        instance._loaded_polyline = loaded if loaded is _UNLOADED else copy.deepcopy(loaded)
+        instance._loaded_rollup = loaded_values(instance, PROJECT_ROLLUP_FIELDS)
+        return instance
+
+    def polyline_changed(self):
+        return getattr(self, '_loaded_polyline', _UNLOADED) != self.polyline_coordinates
+
+    def update_derived_polylines(self):
+        self.polyline_levels = build_levels(self.polyline_coordinates) or None
+        points = list(polyline_points(self.polyline_coordinates))
+        self.polyline_encoded = polyline.encode(points) if points else None
+        self.set_polyline_metrics(polyline_metrics(self.polyline_coordinates))
+
+    def set_polyline_metrics(self, metrics):
+        """Copy geometry.polyline_metrics() output (None for no polyline) into the metric columns"""
+        if metrics is None:
+            self.polyline_length_km = self.polyline_centroid_lat = self.polyline_centroid_lng = None
+            self.polyline_vertex_count = 0
+            return
+        self.polyline_length_km = metrics['length_km']
+        self.polyline_vertex_count = metrics['vertex_count']
+        self.polyline_centroid_lat, self.polyline_centroid_lng = metrics['centroid']
+
+    def polyline_for_tolerance(self, tolerance):
+        """Polyline simplified to the coarsest stored level finer than tolerance (degrees)"""
+        return select_level(self.polyline_coordinates, self.polyline_levels, tolerance)
+
+    def update_bounds(self):
+        points = project_points(self.latitude, self.longitude, self.polyline_coordinates)
+        bounds = coordinate_bounds(points) or (None, None, None, None)
+        self.bbox_min_lat, self.bbox_min_lng, self.bbox_max_lat, self.bbox_max_lng = bounds
+
+    def refresh_derived_fields(self):
+        """Recompute stored bounds and, if the polyline changed, its derived copies; returns the fields touched"""
+        self.update_bounds()
+        fields = list(BOUNDS_FIELDS)
+        if self.polyline_changed():
+            self.update_derived_polylines()
+            fields += ['polyline_levels', 'polyline_encoded', *POLYLINE_METRIC_FIELDS]
+        return fields
+
+    def save(self, *args, **kwargs):
+        extra_fields = self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and GEOMETRY_SOURCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields).union(extra_fields)
+        # post_save runs outside save()'s own transaction; the rollups it updates must not
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_polyline = copy.deepcopy(self.polyline_coordinates)
+
+    def delete(self, *args, **kwargs):
+        # Values loaded with this instance may be stale; pre_delete re-reads them (rollups.py)
+        self._loaded_rollup = None
+        return super().delete(*args, **kwargs)
+
 
 class RoadSegment(models.Model):
     ROAD_TYPE_CHOICES = [
@@ -79,39 +190,202 @@ class RoadSegment(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='roadsegment_name_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='roadsegment_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.project.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rollup = loaded_values(instance, SEGMENT_ROLLUP_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # post_save runs outside save()'s own transaction; the rollups it updates must not
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Values loaded with this instance may be stale; pre_delete re-reads them (rollups.py)
+        self._loaded_rollup = None
+        return super().delete(*args, **kwargs)
+
 
 class ProjectPhoto(models.Model):
+    PROCESSING_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
     project = models.ForeignKey(RoadProject, on_delete=models.CASCADE, related_name='photos')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='project_photos/')
+    # Content-addressed: identical uploads share one file, see storage.py
+    image = models.ImageField(upload_to='project_photos/', storage=photo_storage)
     # Future: Geospatial field for photo location (requires PostGIS setup)
     # location = models.PointField(null=True, blank=True, help_text="Photo location")
     latitude = models.FloatField(null=True, blank=True, help_text="Photo latitude")
     longitude = models.FloatField(null=True, blank=True, help_text="Photo longitude")
     taken_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    # Filled in by the background photo pipeline after upload
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_CHOICES, default='pending', editable=False)
+    variants = models.JSONField(null=True, blank=True, editable=False, help_text="Resized JPEG/WebP copies keyed by size")
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, help_text="SHA-256 of the image file")
+    # Web-mercator cell at PHOTO_GRID_ZOOM; the cell at any lower zoom is a bit shift away (see clustering.py)
+    grid_x = models.IntegerField(null=True, blank=True, editable=False)
+    grid_y = models.IntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='projectphoto_lat_lng_idx'),
+            models.Index(fields=['taken_at', 'id'], name='projectphoto_taken_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='projectphoto_updated_id_idx'),
+            models.Index(fields=['content_hash', 'project'], name='projectphoto_hash_idx'),
+            models.Index(fields=['grid_x', 'grid_y'], name='projectphoto_grid_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.project.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image', _UNLOADED)
+        return instance
+
+    def image_changed(self):
+        loaded = getattr(self, '_loaded_image', None)
+        if loaded is _UNLOADED and 'image' not in self.__dict__:
+            return False
+        return bool(self.image) and self.image.name != getattr(loaded, 'name', loaded)
+
+    def update_grid_cell(self):
+        if self.latitude is None or self.longitude is None:
+            self.grid_x = self.grid_y = None
+        else:
+            self.grid_x, self.grid_y = mercator_cell(self.latitude, self.longitude, PHOTO_GRID_ZOOM)
+
+    def save(self, *args, **kwargs):
+        self.update_grid_cell()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and PHOTO_LOCATION_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields).union(['grid_x', 'grid_y'])
+        # Read by the post_save receivers that queue the photo pipeline and release replaced files
+        self._image_changed = self.image_changed()
+        if self._image_changed:
+            if not self.image._committed:
+                # Store the file now so its content hash is known before the row is written
+                self.image.save(self.image.name, self.image.file, save=False)
+            self.content_hash = hash_from_name(self.image.name) or ''
+            self.processing_status = 'pending'
+            self.variants = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields).union(['content_hash', 'processing_status', 'variants'])
+            loaded = getattr(self, '_loaded_image', None)
+            self._replaced_image = getattr(loaded, 'name', loaded) if loaded is not _UNLOADED else None
+        super().save(*args, **kwargs)
+        self._loaded_image = self.image.name
+
+
+class PhotoUpload(models.Model):
+    """
+    A resumable photo upload in progress: the photo's fields are given up
+    front, the file arrives in chunks and the ProjectPhoto is created once
+    all of it is there.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(RoadProject, on_delete=models.CASCADE, related_name='photo_uploads')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total file size in bytes")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256, checked when finalizing")
+    received = models.BigIntegerField(default=0, help_text="Bytes stored so far; the next chunk starts here")
+    photo = models.ForeignKey(ProjectPhoto, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
 
 class ProjectUpdate(models.Model):
     project = models.ForeignKey(RoadProject, on_delete=models.CASCADE, related_name='updates')
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='projectupdate_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='projectupdate_updated_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.project.name}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted object, so sync clients can drop their local copy"""
+    collection = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.collection} {self.object_id}"
+
+
+class CollectionVersion(models.Model):
+    """Counter bumped whenever a collection changes, used for ETags on list endpoints"""
+    name = models.CharField(max_length=20, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class StatsRollup(models.Model):
+    """
+    Running count and total of one dashboard group, e.g. the projects with
+    status "planned" and their budget; maintained by rollups.py
+    """
+    dimension = models.CharField(max_length=30)
+    key = models.CharField(max_length=20, blank=True)
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=24, decimal_places=6, default=0)
+
+    class Meta:
+        ordering = ['dimension', 'key']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='statsrollup_dimension_key_uniq'),
+        ]
 
     def __str__(self):
-        return f"{self.title} - {self.project.name}"
\ No newline at end of file
+        return f"{self.dimension} {self.key}: {self.count}"
\ No newline at end of file
@@ -0,0 +1,139 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset ordering plus the primary key.
+
+    Pages are fetched with WHERE (created_at, id) < (last_created_at, last_id)
+    instead of OFFSET, and no COUNT(*) is run, so deep pages cost the same
+    as the first one given a composite index on the ordering columns.
+    Ordering comes from the queryset (usually the model's Meta.ordering)
+    with the primary key appended as a tie-breaker; ordering columns
+    must be non-null.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        names = [field.lstrip('-') for field in ordering]
+        if 'id' not in names:
+            descending = ordering[0].startswith('-') if ordering else False
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request, model, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values = payload['p']
+            if len(values) != len(ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position, 'r': int(reverse)}
+        data = json.dumps(payload, default=str, separators=(',', ':')).encode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, base64.urlsafe_b64encode(data).decode()
+        )
+
+    @staticmethod
+    def seek_filter(ordering, position, reverse):
+        """Rows strictly after position in ordering (or before it when reverse)"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset, view)
+        position, reverse = self.decode_cursor(request, queryset.model, ordering)
+
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position, reverse))
+        if reverse:
+            queryset = queryset.order_by(*[field[1:] if field.startswith('-') else f'-{field}' for field in ordering])
+        else:
+            queryset = queryset.order_by(*ordering)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        names = [field.lstrip('-') for field in ordering]
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = [self.row_value(rows[-1], name) for name in names]
+            if position is not None and (has_more or not reverse):
+                self.previous_position = [self.row_value(rows[0], name) for name in names]
+        return rows
+
+    @staticmethod
+    def row_value(row, name):
+        # Rows are model instances, or dicts when paginating a .values() queryset
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,140 @@
+"""
+Background processing of uploaded photos.
+
+After a photo is saved with a new image it is queued here (once the
+transaction commits) instead of being processed in the upload request.
+Processing reads the original from storage, takes its GPS position from
+EXIF when the uploader gave none, and writes resized JPEG and WebP
+variants next to it.
+
+PHOTO_PIPELINE selects how work runs, with no broker involved:
+  "process"  decoding and resizing in a process pool, storage and
+             database writes on a small thread pool (default)
+  "thread"   everything on the thread pool
+  "sync"     inline, in the saving request (handy for scripts)
+Photos left pending by a restart are picked up by `manage.py process_photos`.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connection, transaction
+
+from . import imaging
+from .models import ProjectPhoto
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (160, 480, 1280)
+VARIANT_FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def variant_sizes():
+    return tuple(getattr(settings, 'PHOTO_VARIANT_SIZES', VARIANT_SIZES))
+
+
+def variant_path(photo_id, size, extension):
+    return f'project_photos/variants/{photo_id}/{size}.{extension}'
+
+
+def _pool(kind):
+    # Created lazily so every forked server worker gets its own pools
+    with _pools_lock:
+        if kind not in _pools:
+            workers = getattr(settings, 'PHOTO_PIPELINE_WORKERS', 2)
+            if kind == 'process':
+                # spawn: forking a process that runs threads is unsafe
+                _pools[kind] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                _pools[kind] = ThreadPoolExecutor(workers, thread_name_prefix='photo-pipeline')
+        return _pools[kind]
+
+
+def schedule(photo_id):
+    """Queue a photo for processing once the current transaction commits"""
+    transaction.on_commit(lambda: submit(photo_id))
+
+
+def submit(photo_id):
+    mode = getattr(settings, 'PHOTO_PIPELINE', 'process')
+    if mode == 'sync':
+        process(photo_id)
+    else:
+        _pool('thread').submit(_run, photo_id, mode == 'process')
+
+
+def _run(photo_id, use_processes):
+    try:
+        process(photo_id, use_processes)
+    except Exception:
+        logger.exception("Photo pipeline failed for photo %s", photo_id)
+    finally:
+        # Pool threads outlive requests, so release their connection explicitly
+        connection.close()
+
+
+def delete_variants(variants):
+    for variant in (variants or {}).values():
+        for key in VARIANT_FORMATS:
+            if variant.get(key):
+                default_storage.delete(variant[key])
+
+
+def process(photo_id, use_processes=False):
+    """Extract EXIF GPS and build the variants of one photo; returns the final status"""
+    photo = ProjectPhoto.objects.filter(pk=photo_id).first()
+    if photo is None or not photo.image:
+        return None
+    ProjectPhoto.objects.filter(pk=photo_id).update(processing_status='processing')
+    try:
+        with photo.image.open('rb') as image_file:
+            data = image_file.read()
+        if use_processes:
+            result = _pool('process').submit(imaging.render, data, variant_sizes()).result()
+        else:
+            result = imaging.render(data, variant_sizes())
+    except Exception:
+        logger.exception("Could not decode photo %s", photo_id)
+        photo.processing_status = 'failed'
+        photo.save(update_fields=['processing_status', 'updated_at'])
+        return photo.processing_status
+
+    old_variants = photo.variants
+    variants = {}
+    for size, rendered in result['variants'].items():
+        variant = {'width': rendered['width'], 'height': rendered['height']}
+        for key, extension in VARIANT_FORMATS.items():
+            path = variant_path(photo.pk, size, extension)
+            # Reprocessing replaces the files instead of getting suffixed names
+            default_storage.delete(path)
+            variant[key] = default_storage.save(path, ContentFile(rendered[key]))
+        variants[str(size)] = variant
+
+    fields = ['processing_status', 'variants', 'updated_at']
+    if result['gps'] and photo.latitude is None and photo.longitude is None:
+        photo.latitude, photo.longitude = result['gps']
+        fields += ['latitude', 'longitude']
+    if not photo.content_hash:
+        # Files stored before content addressing carry no hash in their name
+        photo.content_hash = hashlib.sha256(data).hexdigest()
+        fields.append('content_hash')
+    photo.processing_status = 'done'
+    photo.variants = variants
+    try:
+        photo.save(update_fields=fields)
+    except DatabaseError:
+        # Deleted while processing
+        delete_variants(variants)
+        return None
+    delete_variants({
+        size: variant for size, variant in (old_variants or {}).items() if size not in variants
+    })
+    return photo.processing_status
@@ -0,0 +1,57 @@
+"""
+Google encoded polyline format.
+
+Coordinates are scaled to integers, delta-encoded against the previous
+vertex and written as base64-ish 5-bit chunks, which is typically 4-6x
+smaller than the equivalent JSON array of float pairs.
+"""
+PRECISION = 5
+
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode(points, precision=PRECISION):
+    """Encode an iterable of (lat, lng) pairs"""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lng_i - prev_lng, out)
+        prev_lat, prev_lng = lat_i, lng_i
+    return ''.join(out)
+
+
+def decode(encoded, precision=PRECISION):
+    """Decode to a list of [lat, lng] pairs; raises ValueError on truncated input"""
+    factor = 10 ** precision
+    points = []
+    index = 0
+    lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if index >= length:
+                    raise ValueError('Truncated encoded polyline')
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append([lat / factor, lng / factor])
+    return points
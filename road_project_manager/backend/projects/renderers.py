@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to DRF's encoder
+    orjson = None
+
+
+def _default(value):
+    """Types orjson does not handle natively"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Promise):
+        return str(value)
+    if hasattr(value, 'tolist'):  # numpy scalars and arrays
+        return value.tolist()
+    if hasattr(value, '__iter__'):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, selected with ?format=orjson.
+
+    Output is compact UTF-8 JSON like JSONRenderer's; dates and datetimes
+    are written in ISO 8601 and Decimals as strings.
+    """
+    format = 'orjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z)
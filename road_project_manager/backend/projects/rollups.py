@@ -0,0 +1,227 @@
+"""
+Dashboard statistics kept in a rollup table.
+
+StatsRollup holds one row per group the dashboard shows (all projects,
+projects per status and per priority, all segments, segments per road and
+surface type) with a running count and total: the budget for projects,
+length_km for segments. Signals apply the difference each save, delete or
+bulk write makes, inside the writing transaction, so reading the stats is
+one query over a few dozen rows however many projects there are.
+
+The difference is taken from the values stored before the write, not the
+ones an instance was loaded with, which may be stale: save() and delete()
+lock the row and re-read them (load_previous), and bulk updates load
+their instances with the rows locked in the writing transaction.
+
+rebuild() recomputes the rows with GROUP BY queries. The migration and the
+rebuild_stats command use it, and saves fall back to it when the values a
+row had before are unknown.
+"""
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import (
+    PROJECT_ROLLUP_FIELDS, SEGMENT_ROLLUP_FIELDS, RoadProject, RoadSegment, StatsRollup, loaded_values
+)
+
+TOTAL_PLACES = Decimal('0.000001')
+
+# Per model label: (output section, total field, tracked fields, [(dimension, grouped field or None)])
+ROLLUPS = {
+    'projects.RoadProject': ('projects', 'budget', PROJECT_ROLLUP_FIELDS, [
+        ('projects', None), ('project_status', 'status'), ('project_priority', 'priority'),
+    ]),
+    'projects.RoadSegment': ('segments', 'length_km', SEGMENT_ROLLUP_FIELDS, [
+        ('segments', None), ('segment_road_type', 'road_type'), ('segment_surface_type', 'surface_type'),
+    ]),
+}
+ROLLUP_MODELS = [RoadProject, RoadSegment]
+
+
+def _total(value):
+    # Fixed places so adding and later subtracting a value cancels exactly
+    return Decimal(str(value or 0)).quantize(TOTAL_PLACES)
+
+
+def contribution(label, values, sign=1):
+    """(dimension, key, count, total) changes for one row with the tracked values, added or removed"""
+    _, total_field, fields, dimensions = ROLLUPS[label]
+    row = dict(zip(fields, values))
+    total = sign * _total(row[total_field])
+    return [(dimension, row[field] if field else '', sign, total) for dimension, field in dimensions]
+
+
+def apply(changes):
+    """Add (dimension, key, count, total) changes to the rollup rows, in one UPDATE when they exist"""
+    deltas = {}
+    for dimension, key, count, total in changes:
+        current = deltas.get((dimension, key), (0, 0))
+        deltas[(dimension, key)] = (current[0] + count, current[1] + total)
+    deltas = {group: delta for group, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+
+    def per_group(index, output_field):
+        return Case(
+            *[When(dimension=dimension, key=key, then=Value(delta[index], output_field=output_field))
+              for (dimension, key), delta in deltas.items()],
+            default=Value(0, output_field=output_field),
+            output_field=output_field,
+        )
+
+    matches = Q()
+    for dimension, key in deltas:
+        matches |= Q(dimension=dimension, key=key)
+    updated = StatsRollup.objects.filter(matches).update(
+        count=F('count') + per_group(0, models.BigIntegerField()),
+        total=F('total') + per_group(1, models.DecimalField(max_digits=24, decimal_places=6)),
+    )
+    if updated < len(deltas):
+        existing = set(StatsRollup.objects.filter(matches).values_list('dimension', 'key'))
+        for (dimension, key), (count, total) in deltas.items():
+            if (dimension, key) in existing:
+                continue
+            rollup, created = StatsRollup.objects.get_or_create(
+                dimension=dimension, key=key, defaults={'count': count, 'total': total}
+            )
+            if not created:
+                # Created by a concurrent writer since the UPDATE
+                StatsRollup.objects.filter(pk=rollup.pk).update(count=F('count') + count, total=F('total') + total)
+
+
+def compute(label, queryset):
+    """(dimension, key, count, total) rows for a queryset of the labelled model, by GROUP BY"""
+    _, total_field, _, dimensions = ROLLUPS[label]
+    rows = []
+    for dimension, field in dimensions:
+        if field is None:
+            result = queryset.aggregate(count=Count('pk'), total=Sum(total_field))
+            rows.append((dimension, '', result['count'], _total(result['total'])))
+            continue
+        groups = queryset.order_by().values(field).annotate(count=Count('pk'), total=Sum(total_field))
+        rows.extend((dimension, group[field], group['count'], _total(group['total'])) for group in groups)
+    return rows
+
+
+def replace(rollup_model, label, queryset):
+    """Overwrite the rollup rows of one model with ones computed from queryset"""
+    dimensions = [dimension for dimension, _ in ROLLUPS[label][3]]
+    rows = rollup_model.objects.filter(dimension__in=dimensions)
+    # Writers block on the locked rows, so none of their changes is counted twice or lost
+    list(rows.select_for_update())
+    computed = compute(label, queryset)
+    rows.delete()
+    rollup_model.objects.bulk_create([
+        rollup_model(dimension=dimension, key=key, count=count, total=total)
+        for dimension, key, count, total in computed
+    ])
+
+
+def rebuild(*models):
+    """Recompute the rollup rows of the given models (all by default) from their tables"""
+    with transaction.atomic():
+        for model in models or ROLLUP_MODELS:
+            replace(StatsRollup, model._meta.label, model.objects.all())
+
+
+def _current(instance, fields, previous, update_fields):
+    if previous is None or update_fields is None:
+        return tuple(getattr(instance, name) for name in fields)
+    # Fields left out of update_fields keep their stored value
+    return tuple(
+        getattr(instance, name) if name in update_fields else value
+        for name, value in zip(fields, previous)
+    )
+
+
+def saved(instances, created, update_fields=None):
+    """Apply saves or bulk writes of one model's instances to the rollups"""
+    if not instances:
+        return
+    label = instances[0]._meta.label
+    fields = ROLLUPS[label][2]
+    changes = []
+    unknown = False
+    for instance in instances:
+        previous = None if created else getattr(instance, '_loaded_rollup', None)
+        current = _current(instance, fields, previous, update_fields)
+        if not created:
+            if previous is None:
+                unknown = True
+            else:
+                changes += contribution(label, previous, -1)
+        changes += contribution(label, current)
+        instance._loaded_rollup = current
+    if unknown:
+        rebuild(type(instances[0]))
+    else:
+        apply(changes)
+
+
+def deleted(instance):
+    """Remove a deleted row's contribution from the rollups"""
+    label = instance._meta.label
+    fields = ROLLUPS[label][2]
+    values = getattr(instance, '_loaded_rollup', None) or loaded_values(instance, fields)
+    if values is None:
+        rebuild(type(instance))
+    else:
+        apply(contribution(label, values, -1))
+
+
+def load_previous(instance):
+    """Lock the row of an instance about to be saved and read its stored tracked values"""
+    if instance._state.adding or instance.pk is None:
+        return
+    fields = ROLLUPS[instance._meta.label][2]
+    # Concurrent writers of the row wait until this transaction commits, so no change is lost
+    rows = type(instance)._base_manager.select_for_update().filter(pk=instance.pk)
+    instance._loaded_rollup = rows.values_list(*fields).first()
+
+
+def load_deleted(instance):
+    """Lock and read the stored tracked values of an instance about to be deleted, unless just loaded"""
+    if getattr(instance, '_loaded_rollup', None) is None:
+        load_previous(instance)
+
+
+def _format(section, total):
+    if section == 'projects':
+        return str(total.quantize(Decimal('0.01')))
+    # "or": SQLite sums decimals as floats, which can leave -0.0 behind
+    return round(float(total), 3) or 0.0
+
+
+def represent(rows):
+    """Dashboard stats from (dimension, key, count, total) rows, every choice listed"""
+    groups = {(dimension, key): (count, total) for dimension, key, count, total in rows}
+    result = {}
+    for model in ROLLUP_MODELS:
+        section, total_field, _, dimensions = ROLLUPS[model._meta.label]
+        stats = result[section] = {}
+        for dimension, field in dimensions:
+            if field is None:
+                count, total = groups.get((dimension, ''), (0, Decimal(0)))
+                stats.update({'count': count, total_field: _format(section, total)})
+                continue
+            keys = [value for value, _ in model._meta.get_field(field).choices]
+            keys += sorted(key for group, key in groups if group == dimension and key not in keys)
+            stats[f'by_{field}'] = {}
+            for key in keys:
+                count, total = groups.get((dimension, key), (0, Decimal(0)))
+                stats[f'by_{field}'][key] = {'count': count, total_field: _format(section, total)}
+    return result
+
+
+def stats():
+    """Dashboard stats read from the rollup table"""
+    return represent(StatsRollup.objects.values_list('dimension', 'key', 'count', 'total'))
+
+
+def aggregate(projects, segments):
+    """Dashboard stats computed directly from (filtered) project and segment querysets"""
+    return represent(
+        compute('projects.RoadProject', projects) + compute('projects.RoadSegment', segments)
+    )
@@ -1,8 +1,124 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.validators import validate_image_file_extension
+from django.db import models
 from rest_framework import serializers
-from .models import RoadProject, RoadSegment, ProjectPhoto, ProjectUpdate
+from . import fragments, polyline
+from .models import RoadProject, RoadSegment, ProjectPhoto, PhotoUpload, ProjectUpdate
+from .simplify import select_level
+from .spatial import clip_polyline, polyline_points
 
 
-class RoadProjectSerializer(serializers.ModelSerializer):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys from objects preloaded into context['bulk_lookup']
+    by the bulk endpoints, instead of one query per related value.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('bulk_lookup', {}).get(self.get_queryset().model)
+        if preloaded is not None and str(data) in preloaded:
+            return preloaded[str(data)]
+        return super().to_internal_value(data)
+
+
+def sparse_field_names(names, context):
+    """Names kept by the ?fields= / ?omit= lists a view put in the context, in their original order"""
+    requested = context.get('sparse_fields')
+    omitted = context.get('sparse_omit') or ()
+    return [name for name in names if (requested is None or name in requested) and name not in omitted]
+
+
+class SparseFieldsetMixin:
+    """
+    Drops the fields a view excluded with ?fields= / ?omit= (passed in the
+    context) and works out which columns and relations the rest read.
+    """
+    # Columns to_representation reads whatever fields are kept
+    sparse_always = []
+    # Extra columns read when a field is kept, beyond its own source
+    sparse_dependencies = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        kept = set(sparse_field_names(fields, self.context))
+        for name in list(fields):
+            if name not in kept:
+                del fields[name]
+        return fields
+
+    def sparse_query(self):
+        """
+        Return (only, select_related, prefetch_related) sets covering the kept
+        fields, or None when a field's source is not a plain model path.
+        """
+        model = self.Meta.model
+        only = {model._meta.pk.name, *self.sparse_always}
+        select_related, prefetch_related = set(), set()
+        for name, field in self.fields.items():
+            if field.source == '*':
+                return None
+            only.update(self.sparse_dependencies.get(name, ()))
+            path = field.source.split('.')
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch_related.add(path[0])
+            elif model_field.is_relation and len(path) > 1:
+                select_related.add(path[0])
+                only.update([path[0], f'{path[0]}__{path[1]}'])
+            else:
+                only.add(path[0])
+        return only, select_related, prefetch_related
+
+
+def represent_polyline(data, polyline_coordinates, polyline_levels, polyline_encoded, context):
+    """
+    Apply the geometry options a view put in the serializer context to a
+    project's output dict; shared by RoadProjectSerializer and the fast path.
+    """
+    coordinates = polyline_coordinates
+    # Views pass a tolerance (degrees) derived from ?zoom= or ?simplify= for map listings
+    tolerance = context.get('polyline_tolerance')
+    if tolerance is not None:
+        coordinates = select_level(polyline_coordinates, polyline_levels, tolerance)
+    # in_bbox?clip=1 passes viewport boxes; the result is a list of runs
+    clip_boxes = context.get('polyline_clip_boxes')
+    if clip_boxes and coordinates:
+        coordinates = clip_polyline(polyline_points(coordinates), clip_boxes)
+
+    if context.get('geometry_format') == 'encoded':
+        del data['polyline_coordinates']
+        if not coordinates:
+            data['polyline_encoded'] = None
+        elif clip_boxes:
+            data['polyline_encoded'] = [polyline.encode(run) for run in coordinates]
+        elif coordinates is polyline_coordinates and polyline_encoded:
+            data['polyline_encoded'] = polyline_encoded
+        else:
+            data['polyline_encoded'] = polyline.encode(polyline_points(coordinates))
+    else:
+        data['polyline_coordinates'] = coordinates
+    return data
+
+
+class RoadProjectListSerializer(serializers.ListSerializer):
+    """Builds list output from per-project fragments cached by (id, updated_at)"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        return fragments.serialize_many(self.child, iterable)
+
+
+class RoadProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+    # updated_at keys the fragment cache; the stored polyline copies back simplified and encoded output
+    sparse_always = ['updated_at']
+    sparse_dependencies = {'polyline_coordinates': ['polyline_levels', 'polyline_encoded']}
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     assigned_to_names = serializers.StringRelatedField(source='assigned_to', many=True, read_only=True)
 
@@ -12,12 +128,25 @@ class RoadProjectSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'status', 'priority', 'budget',
             'start_date', 'end_date', 'created_at', 'updated_at',
             'created_by', 'created_by_name', 'assigned_to', 'assigned_to_names',
-            'latitude', 'longitude', 'polyline_coordinates', 'polyline_color'
+            'latitude', 'longitude', 'polyline_coordinates', 'polyline_color', 'polyline_length_km'
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at']
+        list_serializer_class = RoadProjectListSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'polyline_coordinates' not in data:
+            # Left out with ?fields= / ?omit=, and possibly not loaded
+            return data
+        return represent_polyline(
+            data, instance.polyline_coordinates, instance.polyline_levels,
+            instance.polyline_encoded, self.context
+        )
 
 
-class RoadSegmentSerializer(serializers.ModelSerializer):
+class RoadSegmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = RoadSegment
         fields = [
@@ -27,25 +156,84 @@ class RoadSegmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class ProjectPhotoSerializer(serializers.ModelSerializer):
+def represent_variant(variant, request=None):
+    """One photo pipeline variant with its storage names turned into (absolute) URLs"""
+    def url(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return {
+        'width': variant['width'],
+        'height': variant['height'],
+        'jpeg': url(variant['jpeg']),
+        'webp': url(variant['webp']),
+    }
+
+
+class PhotoVariantsField(serializers.Field):
+    """
+    Resized copies built by the photo pipeline, keyed by longest edge:
+    {"480": {"width", "height", "jpeg", "webp"}} with absolute URLs, or
+    null while the photo is still being processed.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        request = self.context.get('request')
+        return {size: represent_variant(variant, request) for size, variant in variants.items()}
+
+
+class ProjectPhotoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.username', read_only=True)
+    thumbnails = PhotoVariantsField(source='variants')
 
     class Meta:
         model = ProjectPhoto
         fields = [
-            'id', 'project', 'title', 'description', 'image',
-            'latitude', 'longitude', 'taken_at', 'uploaded_by', 'uploaded_by_name'
+            'id', 'project', 'title', 'description', 'image', 'thumbnails', 'processing_status',
+            'latitude', 'longitude', 'taken_at', 'updated_at', 'uploaded_by', 'uploaded_by_name'
         ]
-        read_only_fields = ['uploaded_by', 'taken_at']
+        read_only_fields = ['uploaded_by', 'taken_at', 'updated_at', 'processing_status']
+
+
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PhotoUpload
+        fields = [
+            'id', 'project', 'title', 'description', 'latitude', 'longitude',
+            'filename', 'size', 'sha256', 'received', 'photo', 'created_at'
+        ]
+        read_only_fields = ['received', 'photo', 'created_at']
+
+    def validate_filename(self, value):
+        # The same extensions ProjectPhoto.image accepts from multipart uploads
+        validate_image_file_extension(File(None, name=value))
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive.")
+        if value > settings.PHOTO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Photos are limited to {settings.PHOTO_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest.")
+        return value
 
 
-class ProjectUpdateSerializer(serializers.ModelSerializer):
+class ProjectUpdateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
 
     class Meta:
         model = ProjectUpdate
         fields = [
-            'id', 'project', 'title', 'content', 'created_at',
+            'id', 'project', 'title', 'content', 'created_at', 'updated_at',
             'created_by', 'created_by_name'
         ]
-        read_only_fields = ['created_by', 'created_at']
\ No newline at end of file
+        read_only_fields = ['created_by', 'created_at', 'updated_at']
\ No newline at end of file
@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import clustering, photo_pipeline, rollups, storage, sync, uploads, versions
+from .models import RoadProject, RoadSegment, ProjectPhoto, PhotoUpload, ProjectUpdate
+from .spatial import project_index
+
+# Sent by the bulk endpoints, which bypass save() and post_save.
+# Arguments: sender (model class), instances, created
+bulk_saved = Signal()
+
+
+@receiver(post_delete, sender=RoadProject)
+def drop_project_from_spatial_index(sender, instance, **kwargs):
+    project_id = instance.pk
+    # After commit, so a rolled back delete leaves the project in the indexes
+    transaction.on_commit(lambda: project_index.discard(project_id))
+    transaction.on_commit(lambda: clustering.project_clusters.discard(project_id))
+
+
+@receiver(post_save, sender=RoadProject)
+@receiver(bulk_saved, sender=RoadProject)
+def update_project_clusters(sender, instance=None, instances=None, **kwargs):
+    saved = [instance] if instance is not None else list(instances)
+    # After commit, so a rolled back save never reaches the index
+    transaction.on_commit(lambda: clustering.project_clusters.update(saved))
+
+
+@receiver(post_delete, sender=RoadProject)
+@receiver(post_delete, sender=RoadSegment)
+@receiver(post_delete, sender=ProjectPhoto)
+@receiver(post_delete, sender=ProjectUpdate)
+def record_sync_tombstone(sender, instance, **kwargs):
+    sync.record_deletion(instance)
+
+
+@receiver(post_save, sender=RoadProject)
+@receiver(post_delete, sender=RoadProject)
+@receiver(bulk_saved, sender=RoadProject)
+@receiver(m2m_changed, sender=RoadProject.assigned_to.through)
+def bump_project_version(sender, **kwargs):
+    # Also retires the cached project tiles, which are keyed by this version (tiles.layer_version)
+    if kwargs.get('action', 'post_').startswith('post_'):
+        versions.bump('projects')
+
+
+@receiver(m2m_changed, sender=RoadProject.assigned_to.through)
+def touch_reassigned_projects(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Bump updated_at on projects whose assignees changed, so per-project
+    fragments keyed by updated_at and sync clients see the new list.
+    """
+    if not reverse:
+        project_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # Remember which projects lose this user before the rows are gone
+        instance._cleared_project_ids = list(instance.assigned_projects.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        project_ids = getattr(instance, '_cleared_project_ids', [])
+    else:
+        project_ids = pk_set or []
+    if action.startswith('post_') and project_ids:
+        RoadProject.objects.filter(pk__in=project_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RoadSegment)
+@receiver(post_delete, sender=RoadSegment)
+@receiver(bulk_saved, sender=RoadSegment)
+def bump_segment_version(sender, **kwargs):
+    versions.bump('segments')
+
+
+@receiver(post_save, sender=ProjectPhoto)
+@receiver(post_delete, sender=ProjectPhoto)
+def bump_photo_version(sender, **kwargs):
+    # Also retires the cached photo tiles and clusters, which are keyed by this version
+    versions.bump('photos')
+
+
+@receiver(post_save, sender=ProjectUpdate)
+@receiver(post_delete, sender=ProjectUpdate)
+def bump_update_version(sender, **kwargs):
+    versions.bump('updates')
+
+
+@receiver(pre_save, sender=RoadProject)
+@receiver(pre_save, sender=RoadSegment)
+def load_previous_rollup_values(sender, instance, **kwargs):
+    rollups.load_previous(instance)
+
+
+@receiver(pre_delete, sender=RoadProject)
+@receiver(pre_delete, sender=RoadSegment)
+def load_deleted_rollup_values(sender, instance, **kwargs):
+    # Rows collected by a delete() were just loaded inside its transaction and are not re-read
+    rollups.load_deleted(instance)
+
+
+@receiver(post_save, sender=RoadProject)
+@receiver(post_save, sender=RoadSegment)
+@receiver(bulk_saved, sender=RoadProject)
+@receiver(bulk_saved, sender=RoadSegment)
+def update_stats_rollups(sender, instance=None, instances=None, created=False, update_fields=None, **kwargs):
+    # In the writing transaction, so the stats roll back with it
+    saved = [instance] if instance is not None else list(instances)
+    rollups.saved(saved, created, update_fields)
+
+
+@receiver(post_delete, sender=RoadProject)
+@receiver(post_delete, sender=RoadSegment)
+def remove_from_stats_rollups(sender, instance, **kwargs):
+    rollups.deleted(instance)
+
+
+@receiver(post_save, sender=ProjectPhoto)
+def queue_photo_processing(sender, instance, **kwargs):
+    if getattr(instance, '_image_changed', False):
+        photo_pipeline.schedule(instance.pk)
+
+
+@receiver(post_delete, sender=ProjectPhoto)
+def delete_photo_files(sender, instance, **kwargs):
+    variants, name = instance.variants, instance.image.name
+    transaction.on_commit(lambda: photo_pipeline.delete_variants(variants))
+    # Other photos may share the file, so only release it
+    transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(post_save, sender=ProjectPhoto)
+def release_replaced_photo_file(sender, instance, **kwargs):
+    name = getattr(instance, '_replaced_image', None)
+    if getattr(instance, '_image_changed', False) and name:
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(post_delete, sender=PhotoUpload)
+def discard_staged_upload(sender, instance, **kwargs):
+    uploads.discard(instance)
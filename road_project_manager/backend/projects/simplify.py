@@ -0,0 +1,114 @@
+"""
+Zoom-dependent polyline simplification.
+
+Each project stores a small pyramid of Douglas-Peucker simplified copies of
+its polyline, one per entry in LEVEL_ZOOMS, computed with a tolerance of
+one screen pixel at that zoom. List endpoints pick the coarsest level that
+is still finer than the requested tolerance.
+"""
+import math
+
+import numpy as np
+
+from .spatial import polyline_points
+
+LEVEL_ZOOMS = (5, 8, 11, 14)
+TILE_SIZE = 256
+METERS_PER_DEGREE = 111320.0
+
+
+def tolerance_for_zoom(zoom):
+    """Width of one screen pixel in degrees at a web-mercator zoom level"""
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def tolerance_for_meters(meters):
+    return meters / METERS_PER_DEGREE
+
+
+def _segment_distances(points, starts, ends):
+    """Row-wise distance of each point to its segment, in the same planar units"""
+    direction = ends - starts
+    length_sq = np.einsum('ij,ij->i', direction, direction)
+    t = np.einsum('ij,ij->i', points - starts, direction) / np.where(length_sq == 0.0, 1.0, length_sq)
+    nearest = starts + np.clip(t, 0.0, 1.0)[:, None] * direction
+    return np.hypot(*(points - nearest).T)
+
+
+def douglas_peucker_mask(points, tolerance):
+    """
+    Return a boolean mask of the vertices Douglas-Peucker keeps.
+
+    points is an (n, 2) array in planar units. Instead of recursing span by
+    span, every pass measures all undecided vertices against the chord of
+    the span they fall in and splits all spans at once, so the Python loop
+    runs once per recursion depth rather than once per split.
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    undecided = np.ones(count, dtype=bool)
+    undecided[0] = undecided[-1] = False
+    while undecided.any():
+        kept = np.flatnonzero(keep)
+        candidates = np.flatnonzero(undecided)
+        span = np.searchsorted(kept, candidates, side='right') - 1
+        distances = _segment_distances(points[candidates], points[kept[span]], points[kept[span + 1]])
+
+        # Candidates are ordered, so each span is a contiguous run
+        run_starts = np.flatnonzero(np.r_[True, np.diff(span) != 0])
+        run_of = np.cumsum(np.r_[True, np.diff(span) != 0]) - 1
+        run_max = np.maximum.reduceat(distances, run_starts)
+        splitting = run_max > tolerance
+
+        at_max = np.flatnonzero((distances == run_max[run_of]) & splitting[run_of])
+        _, first = np.unique(run_of[at_max], return_index=True)
+        split = candidates[at_max[first]]
+        keep[split] = True
+        undecided[split] = False
+        undecided[candidates[~splitting[run_of]]] = False
+    return keep
+
+
+def planar(coords):
+    """
+    Project [lat, lng] pairs onto an equirectangular plane in degrees,
+    shrinking longitude by the cosine of the mean latitude so tolerances
+    mean roughly the same ground distance in both axes.
+    """
+    array = np.asarray(coords, dtype=float)
+    scale = math.cos(math.radians(float(array[:, 0].mean())))
+    return np.column_stack((array[:, 1] * scale, array[:, 0]))
+
+
+def build_levels(polyline_coordinates):
+    """
+    Return {str(zoom): [[lat, lng], ...]} for every level that actually
+    drops vertices; missing levels fall back to the full polyline.
+
+    Levels are built finest first and each coarser level simplifies the
+    previous result, so the expensive pass only runs once on the full line.
+    """
+    coords = [[lat, lng] for lat, lng in polyline_points(polyline_coordinates)]
+    if len(coords) < 3:
+        return {}
+    xy = planar(coords)
+    indices = np.arange(len(coords))
+    levels = {}
+    for zoom in sorted(LEVEL_ZOOMS, reverse=True):
+        indices = indices[douglas_peucker_mask(xy[indices], tolerance_for_zoom(zoom))]
+        if len(indices) < len(coords):
+            levels[str(zoom)] = [coords[i] for i in indices]
+    return levels
+
+
+def select_level(polyline_coordinates, levels, tolerance):
+    """Pick the coarsest stored level whose tolerance does not exceed the requested one"""
+    if tolerance is None or not levels:
+        return polyline_coordinates
+    for zoom in LEVEL_ZOOMS:
+        if tolerance_for_zoom(zoom) <= tolerance:
+            return levels.get(str(zoom), polyline_coordinates)
+    return polyline_coordinates
@@ -0,0 +1,331 @@
+import math
+import threading
+
+from django.db.models import Count, Max
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return (min_lat, min_lng, max_lat, max_lng) enclosing a circle.
+    Longitude span widens with latitude; it is clamped to the whole
+    globe near the poles.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat = max(-90.0, lat - lat_delta)
+    max_lat = min(90.0, lat + lat_delta)
+    # Widest longitude span occurs at the latitude closest to a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    cos_lat = math.cos(math.radians(widest))
+    if cos_lat < 1e-9 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    lng_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    return min_lat, lng - lng_delta, max_lat, lng + lng_delta
+
+
+def mercator(lat, lng):
+    """Web-mercator position of a point as fractions (0..1) of the world, x east and y south"""
+    lat = max(-MERCATOR_MAX_LATITUDE, min(MERCATOR_MAX_LATITUDE, lat))
+    sin_lat = math.sin(math.radians(lat))
+    return (lng + 180.0) / 360.0, 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+
+
+def mercator_cell(lat, lng, zoom):
+    """(x, y) of the web-mercator tile at zoom containing a point"""
+    n = 2 ** zoom
+    x, y = mercator(lat, lng)
+    return min(n - 1, max(0, int(x * n))), min(n - 1, max(0, int(y * n)))
+
+
+def polyline_points(coordinates):
+    """Yield valid (lat, lng) pairs from a stored polyline_coordinates value"""
+    if not isinstance(coordinates, (list, tuple)):
+        return
+    for coord in coordinates:
+        try:
+            lat, lng = float(coord[0]), float(coord[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        if -90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0:
+            yield lat, lng
+
+
+def project_points(latitude, longitude, polyline_coordinates):
+    """All (lat, lng) pairs describing a project: polyline vertices and centre"""
+    points = list(polyline_points(polyline_coordinates))
+    if latitude is not None and longitude is not None:
+        points.extend(polyline_points([[latitude, longitude]]))
+    return points
+
+
+def coordinate_bounds(points):
+    """Return (min_lat, min_lng, max_lat, max_lng) of (lat, lng) pairs, or None"""
+    points = list(points)
+    if not points:
+        return None
+    lats = [lat for lat, _ in points]
+    lngs = [lng for _, lng in points]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def parse_bbox(value):
+    """
+    Parse a "minLng,minLat,maxLng,maxLat" query string.
+
+    Returns a list of (min_lat, min_lng, max_lat, max_lng) boxes; a box
+    crossing the antimeridian (minLng > maxLng) is split in two.
+    Raises ValueError on malformed input.
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox needs four comma separated numbers')
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not (-90.0 <= min_lat <= max_lat <= 90.0):
+        raise ValueError('bbox latitudes out of range')
+    if not (-180.0 <= min_lng <= 180.0 and -180.0 <= max_lng <= 180.0):
+        raise ValueError('bbox longitudes out of range')
+    if min_lng > max_lng:
+        return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+    return [(min_lat, min_lng, max_lat, max_lng)]
+
+
+def pad_box(box, fraction):
+    """Grow a box by a fraction of its size on every side"""
+    min_lat, min_lng, max_lat, max_lng = box
+    lat_pad = (max_lat - min_lat) * fraction
+    lng_pad = (max_lng - min_lng) * fraction
+    return (
+        max(-90.0, min_lat - lat_pad), max(-180.0, min_lng - lng_pad),
+        min(90.0, max_lat + lat_pad), min(180.0, max_lng + lng_pad),
+    )
+
+
+def boxes_intersect(a, b):
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+def clip_polyline(points, boxes):
+    """
+    Keep only the parts of a polyline whose segments touch any of the boxes.
+
+    A segment is kept when its own bounding box intersects a viewport box,
+    which is conservative but never drops a segment crossing the viewport.
+    Returns a list of runs, each a list of [lat, lng] pairs.
+    """
+    points = list(points)
+    if len(points) == 1:
+        lat, lng = points[0]
+        inside = any(boxes_intersect((lat, lng, lat, lng), box) for box in boxes)
+        return [[[lat, lng]]] if inside else []
+    runs = []
+    current = None
+    for (lat1, lng1), (lat2, lng2) in zip(points, points[1:]):
+        segment = (min(lat1, lat2), min(lng1, lng2), max(lat1, lat2), max(lng1, lng2))
+        if any(boxes_intersect(segment, box) for box in boxes):
+            if current is None:
+                current = [[lat1, lng1]]
+                runs.append(current)
+            current.append([lat2, lng2])
+        else:
+            current = None
+    return runs
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid over points tagged with an owner id.
+
+    An owner (e.g. a project) may own many points; distance queries
+    report each owner once, at the distance of its closest point.
+    """
+
+    def __init__(self, cell_size=0.05):
+        self.cell_size = cell_size
+        self.columns = int(math.ceil(360.0 / cell_size))
+        self.cells = {}
+        self.owner_cells = {}
+
+    def __len__(self):
+        return len(self.owner_cells)
+
+    def __contains__(self, owner):
+        return owner in self.owner_cells
+
+    def _cell(self, lat, lng):
+        row = int(math.floor((lat + 90.0) / self.cell_size))
+        col = int(math.floor((lng + 180.0) / self.cell_size)) % self.columns
+        return row, col
+
+    def insert(self, owner, points):
+        """Index points for owner, replacing any it already had"""
+        self.remove(owner)
+        keys = set()
+        for lat, lng in points:
+            key = self._cell(lat, lng)
+            self.cells.setdefault(key, []).append((owner, lat, lng))
+            keys.add(key)
+        if keys:
+            self.owner_cells[owner] = keys
+
+    def remove(self, owner):
+        for key in self.owner_cells.pop(owner, ()):
+            remaining = [entry for entry in self.cells[key] if entry[0] != owner]
+            if remaining:
+                self.cells[key] = remaining
+            else:
+                del self.cells[key]
+
+    def _candidate_cells(self, min_lat, min_lng, max_lat, max_lng):
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, _ = self._cell(max_lat, max_lng)
+        # Columns the range touches, not its width in cells: an edge may sit just inside a column
+        first = int(math.floor((min_lng + 180.0) / self.cell_size))
+        span = int(math.floor((max_lng + 180.0) / self.cell_size)) - first + 1
+        span = min(span, self.columns)
+        if (max_row - min_row + 1) * span > len(self.cells):
+            # Sparse grid: cheaper to filter occupied cells than walk the range
+            cols = {(min_col + i) % self.columns for i in range(span)}
+            return [key for key in self.cells if min_row <= key[0] <= max_row and key[1] in cols]
+        return [
+            (row, (min_col + i) % self.columns)
+            for row in range(min_row, max_row + 1)
+            for i in range(span)
+        ]
+
+    def within(self, lat, lng, radius_km):
+        """Return {owner: distance_km} for owners with a point inside the radius"""
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_km)
+        found = {}
+        for key in self._candidate_cells(min_lat, min_lng, max_lat, max_lng):
+            for owner, point_lat, point_lng in self.cells.get(key, ()):
+                if not min_lat <= point_lat <= max_lat:
+                    continue
+                distance = haversine_km(lat, lng, point_lat, point_lng)
+                if distance <= radius_km and distance < found.get(owner, math.inf):
+                    found[owner] = distance
+        return found
+
+    def nearest(self, lat, lng, radius_km, limit=None):
+        """Return [(owner, distance_km)] within the radius, closest first"""
+        hits = sorted(self.within(lat, lng, radius_km).items(), key=lambda item: (item[1], item[0]))
+        return hits[:limit] if limit else hits
+
+
+class SyncedProjectIndex:
+    """
+    Base for process-local indexes over RoadProject rows.
+
+    The index is built lazily. Before each query the "projects" collection
+    version (versions.py, one indexed row) is compared with the one the
+    index was last brought up to date at, so edits made by other worker
+    processes are picked up. Only when it moved is the (count, latest
+    updated_at) signature read: changed rows are re-indexed incrementally
+    and unexplained deletions trigger a rebuild. Subclasses implement
+    reset(), index_rows() and remove().
+    """
+    columns = ['id', 'latitude', 'longitude', 'polyline_coordinates']
+
+    def __init__(self):
+        self.built = False
+        self.known_ids = set()
+        self.latest = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def reset(self):
+        raise NotImplementedError
+
+    def index_row(self, row):
+        """Index one values() row of self.columns, replacing what the project had"""
+        raise NotImplementedError
+
+    def remove(self, project_id):
+        raise NotImplementedError
+
+    def _index_rows(self, queryset):
+        for row in queryset.values(*self.columns).iterator(chunk_size=2000):
+            self.known_ids.add(row['id'])
+            self.index_row(row)
+
+    def refresh(self):
+        """Bring the index in line with the database"""
+        from . import versions
+        from .models import RoadProject
+        with self.lock:
+            # Read before the rows: a change committed in between is indexed and seen again next time
+            version = versions.current(['projects'])[0]['projects']
+            if self.built and version == self.version:
+                return
+            stats = RoadProject.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+            count, latest = stats['count'], stats['latest']
+            self.version = version
+            if self.built:
+                if count == len(self.known_ids) and latest == self.latest:
+                    return
+                if self.latest is not None and latest is not None:
+                    self._index_rows(RoadProject.objects.filter(updated_at__gte=self.latest))
+                    if count == len(self.known_ids):
+                        self.latest = latest
+                        return
+            self.known_ids = set()
+            self.reset()
+            self._index_rows(RoadProject.objects.all())
+            self.built = True
+            self.latest = latest
+
+    def update(self, instances):
+        """Re-index saved projects in place, when the index is built"""
+        with self.lock:
+            if self.built:
+                for instance in instances:
+                    self.known_ids.add(instance.pk)
+                    self.index_row({name: getattr(instance, 'pk' if name == 'id' else name) for name in self.columns})
+
+    def discard(self, project_id):
+        """Forget a deleted project without forcing a rebuild"""
+        with self.lock:
+            if self.built:
+                self.remove(project_id)
+                self.known_ids.discard(project_id)
+
+
+class ProjectSpatialIndex(SyncedProjectIndex):
+    """Process-local GridIndex over RoadProject centroids and polyline vertices"""
+
+    def __init__(self, cell_size=0.05):
+        super().__init__()
+        self.cell_size = cell_size
+        self.grid = None
+
+    def reset(self):
+        self.grid = GridIndex(self.cell_size)
+
+    def index_row(self, row):
+        points = project_points(row['latitude'], row['longitude'], row['polyline_coordinates'])
+        if points:
+            self.grid.insert(row['id'], points)
+        else:
+            self.grid.remove(row['id'])
+
+    def remove(self, project_id):
+        self.grid.remove(project_id)
+
+    def nearest(self, lat, lng, radius_km, limit=None):
+        self.refresh()
+        return self.grid.nearest(lat, lng, radius_km, limit)
+
+
+project_index = ProjectSpatialIndex()
@@ -0,0 +1,167 @@
+"""
+Pluggable backends for the spatial lookups the views make.
+
+There is one set of models; what varies between deployments is how a
+spatial question gets answered. settings.SPATIAL_BACKEND selects it:
+
+    "postgis"  native PostGIS operators (&&, ST_Intersects, ST_DWithin on
+               geography) over the GiST-indexed geometry tables that
+               geometry_layer.py keeps in sync with the project rows
+    "python"   the process-local grid index (spatial.project_index), the
+               stored bounding box columns and NumPy distances (corridors.py);
+               works on any database
+    "auto"     "postgis" when the geometry tables exist, "python" otherwise
+
+The PostGIS backend sends SQL directly, so it needs PostGIS in the database
+but not GDAL or django.contrib.gis in the application. Both backends return
+the same shapes, so callers never branch on which one is active.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from . import geometry_layer
+from .corridors import PIECE_KM, Corridor, margins
+from .spatial import KM_PER_DEGREE, bounding_box, project_index
+
+# ST_Subdivide keeps at least 5 vertices per piece; with PIECE_KM spacing a piece spans a few km
+CORRIDOR_PIECE_VERTICES = 8
+
+
+class SpatialBackend:
+    name = None
+
+    def nearest_projects(self, lat, lng, radius_km, limit=None):
+        """[(project_id, distance_km)] of projects within radius_km of a point, closest first"""
+        raise NotImplementedError
+
+    def projects_in_boxes(self, queryset, boxes):
+        """Narrow a RoadProject queryset to projects touching any (min_lat, min_lng, max_lat, max_lng) box"""
+        raise NotImplementedError
+
+    def corridor(self, project, buffer_km):
+        """
+        ([(photo_id, distance_km)], [(project_id, distance_km)]) of the photos and
+        other projects within buffer_km of a project's polyline, closest first
+        """
+        raise NotImplementedError
+
+
+class PythonBackend(SpatialBackend):
+    """Grid index over centroids and polyline vertices; bounding box columns for viewports"""
+    name = 'python'
+
+    def nearest_projects(self, lat, lng, radius_km, limit=None):
+        return project_index.nearest(lat, lng, radius_km, limit)
+
+    def projects_in_boxes(self, queryset, boxes):
+        overlaps = Q()
+        for min_lat, min_lng, max_lat, max_lng in boxes:
+            overlaps |= Q(
+                bbox_min_lat__lte=max_lat, bbox_max_lat__gte=min_lat,
+                bbox_min_lng__lte=max_lng, bbox_max_lng__gte=min_lng,
+            )
+        return queryset.filter(overlaps)
+
+    def corridor(self, project, buffer_km):
+        corridor = Corridor(project.polyline_coordinates, buffer_km)
+        return corridor.photos(), corridor.projects(exclude=project.pk)
+
+
+# The envelope (&&) prefilter runs on the GiST indexes; ST_DWithin on geography is the exact test
+NEAREST_SQL = """
+WITH target AS (SELECT ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326)::geography AS geog),
+near AS (
+    SELECT g.id, g.geom FROM projects_roadproject_point_geom g
+    WHERE g.geom && ST_MakeEnvelope(%(min_lng)s, %(min_lat)s, %(max_lng)s, %(max_lat)s, 4326)
+    UNION ALL
+    SELECT g.id, g.geom FROM projects_roadproject_line_geom g
+    WHERE g.geom && ST_MakeEnvelope(%(min_lng)s, %(min_lat)s, %(max_lng)s, %(max_lat)s, 4326)
+)
+SELECT near.id, MIN(ST_Distance(near.geom::geography, target.geog)) / 1000.0 AS distance_km
+FROM near, target
+WHERE ST_DWithin(near.geom::geography, target.geog, %(radius_m)s)
+GROUP BY near.id
+ORDER BY distance_km, near.id
+LIMIT %(limit)s
+"""
+
+# The road is cut into short pieces so each one's expanded envelope is a tight && prefilter
+CORRIDOR_SQL = """
+WITH corridor AS (
+    SELECT ST_Subdivide(ST_Segmentize(geom, %(piece_degrees)s), %(piece_vertices)s) AS geom
+    FROM projects_roadproject_line_geom WHERE id = %(project)s
+)
+SELECT g.id, MIN(ST_Distance(g.geom::geography, corridor.geom::geography)) / 1000.0 AS distance_km
+FROM corridor JOIN ({candidates}) g ON g.geom && ST_Expand(corridor.geom, %(lng_margin)s, %(lat_margin)s)
+WHERE ST_DWithin(g.geom::geography, corridor.geom::geography, %(buffer_m)s)
+GROUP BY g.id
+ORDER BY distance_km, g.id
+"""
+
+CORRIDOR_PHOTOS_SQL = 'SELECT id, geom FROM projects_projectphoto_point_geom'
+CORRIDOR_PROJECTS_SQL = """
+SELECT id, geom FROM projects_roadproject_line_geom WHERE id <> %(project)s
+UNION ALL
+SELECT id, geom FROM projects_roadproject_point_geom WHERE id <> %(project)s
+"""
+
+BOX_TEST_SQL = 'ST_Intersects(geom, ST_MakeEnvelope(%s, %s, %s, %s, 4326))'
+
+
+class PostGISBackend(SpatialBackend):
+    """Exact distances and intersections against project points and lines, served by GiST indexes"""
+    name = 'postgis'
+
+    def nearest_projects(self, lat, lng, radius_km, limit=None):
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_km)
+        params = {
+            'lat': lat, 'lng': lng, 'radius_m': radius_km * 1000.0, 'limit': limit,
+            'min_lat': min_lat, 'min_lng': min_lng, 'max_lat': max_lat, 'max_lng': max_lng,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(NEAREST_SQL, params)
+            return [(project_id, float(distance)) for project_id, distance in cursor.fetchall()]
+
+    def projects_in_boxes(self, queryset, boxes):
+        tests = ' OR '.join([BOX_TEST_SQL] * len(boxes))
+        params = [value for min_lat, min_lng, max_lat, max_lng in boxes for value in (min_lng, min_lat, max_lng, max_lat)]
+        ids = RawSQL(
+            f'SELECT id FROM projects_roadproject_line_geom WHERE {tests} '
+            f'UNION SELECT id FROM projects_roadproject_point_geom WHERE {tests}',
+            params * 2,
+        )
+        return queryset.filter(id__in=ids)
+
+    def corridor(self, project, buffer_km):
+        lat_margin, lng_margin = margins(buffer_km, max(abs(project.bbox_min_lat or 0), abs(project.bbox_max_lat or 0)))
+        params = {
+            'project': project.pk, 'buffer_m': buffer_km * 1000.0,
+            'piece_degrees': PIECE_KM / KM_PER_DEGREE, 'piece_vertices': CORRIDOR_PIECE_VERTICES,
+            'lat_margin': lat_margin, 'lng_margin': lng_margin,
+        }
+        hits = []
+        with connection.cursor() as cursor:
+            for candidates in (CORRIDOR_PHOTOS_SQL, CORRIDOR_PROJECTS_SQL):
+                cursor.execute(CORRIDOR_SQL.format(candidates=candidates), params)
+                hits.append([(hit_id, float(distance)) for hit_id, distance in cursor.fetchall()])
+        return tuple(hits)
+
+
+BACKENDS = {backend.name: backend for backend in (PythonBackend, PostGISBackend)}
+_backends = {}
+
+
+def get_backend():
+    """The backend settings.SPATIAL_BACKEND selects; "auto" is resolved once per process"""
+    choice = getattr(settings, 'SPATIAL_BACKEND', 'auto')
+    if choice not in _backends:
+        name = choice
+        if choice == 'auto':
+            name = 'postgis' if geometry_layer.installed() else 'python'
+        if name not in BACKENDS:
+            raise ImproperlyConfigured(f"SPATIAL_BACKEND must be one of auto, {', '.join(BACKENDS)}")
+        _backends[choice] = BACKENDS[name]()
+    return _backends[choice]
@@ -0,0 +1,119 @@
+"""
+Content-addressed storage for photo files.
+
+Files are stored under the SHA-256 of their bytes
+(project_photos/ab/cd/abcd....jpg), so the same image uploaded to several
+projects is kept once and every ProjectPhoto row points at the same blob.
+Saving content that is already stored writes nothing. Blobs are shared,
+so deleting a photo only removes the file once no row references it
+(release()).
+
+Reading, URLs and the actual writes go to the configured default storage,
+so this works on top of FileSystemStorage and S3 alike.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.utils.deconstruct import deconstructible
+
+BLOB_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/(?P<hash>[0-9a-f]{64})(?:\.[^/]*)?$')
+
+
+def content_hash(content):
+    """SHA-256 of a File, read in chunks; the file is rewound afterwards"""
+    known = getattr(content, 'content_hash', None)
+    if known:
+        return known
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(directory, digest, extension):
+    return os.path.join(directory, digest[:2], digest[2:4], digest + extension.lower())
+
+
+def hash_from_name(name):
+    """The content hash encoded in a blob name, or None for files stored before content addressing"""
+    match = BLOB_NAME.search(name or '')
+    return match.group('hash') if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    """Names files by their content and delegates everything else to default_storage"""
+
+    @property
+    def backend(self):
+        return default_storage
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = os.path.split(name)
+        name = blob_name(directory, content_hash(content), os.path.splitext(filename)[1])
+        if self.backend.exists(name):
+            return name
+        return self.backend.save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same content, so never suffix it
+        return name
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+photo_storage = ContentAddressedStorage()
+
+
+def release(name):
+    """
+    Delete a photo file once no ProjectPhoto references it any more.
+
+    Call after the referencing row is gone (on commit). A concurrent upload
+    of the same bytes between the check and the delete would lose its file;
+    the window is a single query.
+    """
+    from .models import ProjectPhoto
+
+    if not name:
+        return False
+    references = ProjectPhoto.objects.filter(image=name)
+    digest = hash_from_name(name)
+    if digest is not None:
+        # Narrows the lookup to the (content_hash, project) index
+        references = references.filter(content_hash=digest)
+    if references.exists():
+        return False
+    photo_storage.delete(name)
+    return True
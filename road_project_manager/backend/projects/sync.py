@@ -0,0 +1,188 @@
+"""
+Incremental sync for offline clients.
+
+A sync token records, for each collection, the (updated_at, id) of the last
+row the client received and the position reached in the tombstone log.
+Each request returns only the rows changed after those positions, oldest
+first, plus the ids deleted since, so a device that was offline for a day
+pulls what changed instead of the whole dataset.
+
+Rows saved within the last SYNC_SETTLE_SECONDS are held back until the next
+request, so a transaction that commits late with an older timestamp is not
+skipped. Tokens older than the tombstone retention period are rejected and
+the client has to start over with a full sync.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import RoadProject, RoadSegment, ProjectPhoto, ProjectUpdate, Tombstone
+from .serializers import (
+    RoadProjectSerializer, RoadSegmentSerializer,
+    ProjectPhotoSerializer, ProjectUpdateSerializer
+)
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+class Collection:
+    def __init__(self, model, serializer_class, select_related=(), prefetch_related=(), public=False):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+        # Public collections are readable without logging in, like their viewsets
+        self.public = public
+
+    def queryset(self):
+        return self.model.objects.select_related(*self.select_related).prefetch_related(*self.prefetch_related)
+
+
+COLLECTIONS = {
+    'projects': Collection(RoadProject, RoadProjectSerializer, ['created_by'], ['assigned_to'], public=True),
+    'segments': Collection(RoadSegment, RoadSegmentSerializer),
+    'photos': Collection(ProjectPhoto, ProjectPhotoSerializer, ['uploaded_by']),
+    'updates': Collection(ProjectUpdate, ProjectUpdateSerializer, ['created_by']),
+}
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+def collection_name(model):
+    for name, collection in COLLECTIONS.items():
+        if collection.model is model:
+            return name
+    return None
+
+
+def record_deletion(instance):
+    name = collection_name(type(instance))
+    if name is not None:
+        Tombstone.objects.create(collection=name, object_id=instance.pk)
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def _position(timestamp, pk):
+    return [timestamp.isoformat(), pk]
+
+
+def _parse_position(value):
+    if value is None:
+        return None
+    timestamp, pk = value
+    parsed = parse_datetime(timestamp)
+    if parsed is None or not isinstance(pk, int):
+        raise ValueError
+    return parsed, pk
+
+
+def encode_token(issued, positions):
+    payload = {'i': issued.isoformat(), 'c': positions}
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_token(token):
+    """Return the per-collection positions stored in a token"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        issued = parse_datetime(payload['i'])
+        positions = payload['c']
+        for name, (changed, deleted) in positions.items():
+            _parse_position(changed)
+            _parse_position(deleted)
+    except Exception:
+        raise InvalidToken('Invalid sync token')
+    if issued is None:
+        raise InvalidToken('Invalid sync token')
+    if issued < timezone.now() - retention():
+        raise ExpiredToken('Sync token expired, start a full sync')
+    return positions
+
+
+def _after(field, position):
+    """Rows strictly after position in (field, id) order"""
+    timestamp, pk = position
+    return Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': pk})
+
+
+def _changed_rows(collection, position, horizon, limit):
+    queryset = collection.queryset().filter(updated_at__lte=horizon)
+    if position is not None:
+        queryset = queryset.filter(_after('updated_at', position))
+    return list(queryset.order_by('updated_at', 'id')[:limit + 1])
+
+
+def _deleted_rows(name, position, horizon, limit, initial):
+    tombstones = Tombstone.objects.filter(collection=name, deleted_at__lte=horizon)
+    if initial:
+        # First sync of this collection: nothing to delete, start from the log's end
+        latest = tombstones.order_by('-deleted_at', '-id').values_list('deleted_at', 'id').first()
+        return [], latest, False
+    if position is not None:
+        tombstones = tombstones.filter(_after('deleted_at', position))
+    rows = list(
+        tombstones.order_by('deleted_at', 'id')
+        .values_list('deleted_at', 'id', 'object_id')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = rows[-1][:2]
+    return [object_id for _, _, object_id in rows], position, more
+
+
+def changes(names, token=None, limit=DEFAULT_LIMIT, context=None):
+    """
+    Collect the changes since token for the named collections.
+
+    Returns a dict with the serialized changed rows and deleted ids per
+    collection, the token for the next request and whether more changes
+    are waiting (when a collection hit the limit).
+    """
+    positions = decode_token(token) if token else {}
+    now = timezone.now()
+    horizon = now - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+    result = {'changes': {}, 'deleted': {}, 'more': False}
+
+    for name in names:
+        collection = COLLECTIONS[name]
+        changed_position, deleted_position = positions.get(name, (None, None))
+        changed_position = _parse_position(changed_position)
+        deleted_position = _parse_position(deleted_position)
+
+        rows = _changed_rows(collection, changed_position, horizon, limit)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            changed_position = (rows[-1].updated_at, rows[-1].id)
+        deleted, deleted_position, deleted_more = _deleted_rows(
+            name, deleted_position, horizon, limit, initial=name not in positions
+        )
+
+        serializer = collection.serializer_class(rows, many=True, context=context or {})
+        result['changes'][name] = serializer.data
+        result['deleted'][name] = deleted
+        result['more'] = result['more'] or more or deleted_more
+        positions[name] = [
+            _position(*changed_position) if changed_position else None,
+            _position(*deleted_position) if deleted_position else None,
+        ]
+
+    result['token'] = encode_token(now, positions)
+    return result
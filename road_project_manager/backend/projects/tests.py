@@ -0,0 +1,431 @@
+import datetime
+import hashlib
+import io
+import math
+import shutil
+import tempfile
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import rollups, spatial_backends, tiles
+from .geometry import point_segment_km, polyline_array, segment_segment_km
+from .spatial import GridIndex, haversine_km, project_index
+from .models import PhotoUpload, ProjectPhoto, ProjectUpdate, RoadProject, RoadSegment
+
+
+def clear_caches():
+    # Cache keys embed collection versions, which each test's rollback hands out again
+    for alias in ('default', 'responses', 'fragments'):
+        caches[alias].clear()
+
+
+class StatsRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='planner')
+        self.project = RoadProject.objects.create(
+            name='Ring road', created_by=self.user, status='planned', priority='low', budget=10
+        )
+
+    def assertRollupsMatchTables(self):
+        stats = rollups.stats()
+        rollups.rebuild()
+        self.assertEqual(stats, rollups.stats())
+
+    def test_saves_of_stale_instances(self):
+        first = RoadProject.objects.get(pk=self.project.pk)
+        second = RoadProject.objects.get(pk=self.project.pk)
+        first.status = 'in_progress'
+        first.save()
+        second.status = 'completed'
+        second.save()
+
+        by_status = rollups.stats()['projects']['by_status']
+        self.assertEqual(by_status['planned']['count'], 0)
+        self.assertEqual(by_status['in_progress']['count'], 0)
+        self.assertEqual(by_status['completed']['count'], 1)
+        self.assertRollupsMatchTables()
+
+    def test_partial_saves_of_stale_instances(self):
+        first = RoadProject.objects.get(pk=self.project.pk)
+        second = RoadProject.objects.get(pk=self.project.pk)
+        first.budget = 99
+        first.save(update_fields=['budget'])
+        second.priority = 'high'
+        second.save(update_fields=['priority'])
+
+        stats = rollups.stats()['projects']
+        self.assertEqual(stats['by_priority']['high'], {'count': 1, 'budget': '99.00'})
+        self.assertRollupsMatchTables()
+
+    def test_delete_of_stale_instance(self):
+        segment = RoadSegment.objects.create(
+            project=self.project, name='North', road_type='local', surface_type='dirt', length_km=2, width_m=3
+        )
+        stale = RoadSegment.objects.get(pk=segment.pk)
+        segment.road_type = 'highway'
+        segment.save()
+        stale.delete()
+
+        self.assertEqual(rollups.stats()['segments']['by_road_type']['highway']['count'], 0)
+        self.assertRollupsMatchTables()
+
+    def test_bulk_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch('/api/projects/bulk/', [{'id': self.project.pk, 'status': 'on_hold'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(rollups.stats()['projects']['by_status']['on_hold']['count'], 1)
+
+        response = client.delete('/api/projects/bulk/', {'ids': [self.project.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(rollups.stats()['projects']['count'], 0)
+        self.assertRollupsMatchTables()
+
+
+class PolylineDerivedFieldTests(TestCase):
+    def test_polyline_changed_in_place(self):
+        user = User.objects.create(username='editor')
+        RoadProject.objects.create(name='Spur', created_by=user, polyline_coordinates=[[1.0, 1.0], [1.1, 1.1]])
+        project = RoadProject.objects.get(name='Spur')
+        project.polyline_coordinates.append([1.2, 1.3])
+        project.save()
+
+        project = RoadProject.objects.get(pk=project.pk)
+        expected = RoadProject(polyline_coordinates=project.polyline_coordinates)
+        expected.update_derived_polylines()
+        self.assertEqual(project.bbox_max_lat, 1.2)
+        self.assertEqual(project.polyline_vertex_count, 3)
+        self.assertEqual(project.polyline_encoded, expected.polyline_encoded)
+        self.assertEqual(project.polyline_length_km, expected.polyline_length_km)
+        self.assertEqual(project.polyline_levels, expected.polyline_levels)
+
+        # Again on the saved instance, whose loaded copy save() refreshed
+        project.polyline_coordinates.append([1.3, 1.4])
+        project.save()
+        self.assertEqual(RoadProject.objects.get(pk=project.pk).polyline_vertex_count, 4)
+
+
+class PhotoUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(MEDIA_ROOT=self.media, PHOTO_UPLOAD_STAGING_DIR=f'{self.media}/staging')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create(username='inspector')
+        self.project = RoadProject.objects.create(name='Bridge', created_by=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        image = io.BytesIO()
+        Image.new('RGB', (32, 32), 'green').save(image, 'JPEG')
+        self.jpeg = image.getvalue()
+
+    def start(self, **fields):
+        data = dict({'project': self.project.pk, 'title': 'Pier', 'filename': 'pier.jpg', 'size': len(self.jpeg)}, **fields)
+        return self.client.post('/api/photo-uploads/', data, format='json')
+
+    def upload(self, **fields):
+        upload_id = self.start(**fields).data['id']
+        self.client.put(
+            f'/api/photo-uploads/{upload_id}/', self.jpeg,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0',
+        )
+        return self.client.post(f'/api/photo-uploads/{upload_id}/finalize/')
+
+    def test_rejects_non_image_filename(self):
+        response = self.start(filename='evil.html')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('filename', response.data)
+
+    def test_stored_extension_follows_content(self):
+        response = self.upload(filename='pier.png')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ProjectPhoto.objects.get(pk=response.data['id']).image.name.endswith('.jpg'))
+
+    def test_skip_transfer_needs_matching_size(self):
+        self.assertEqual(self.upload().status_code, 201)
+        digest = hashlib.sha256(self.jpeg).hexdigest()
+
+        response = self.start(sha256=digest, size=1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['received'], response.data['photo']), (0, None))
+
+        response = self.start(sha256=digest)
+        self.assertEqual(response.data['received'], len(self.jpeg))
+        self.assertIsNotNone(response.data['photo'])
+        self.assertEqual(PhotoUpload.objects.filter(photo__isnull=False).count(), 2)
+
+
+class GridIndexTests(TestCase):
+    def test_matches_brute_force(self):
+        random = np.random.RandomState(2)
+        index = GridIndex(cell_size=0.05)
+        points = {owner: (lat, lng) for owner, (lat, lng) in enumerate(random.uniform(-1, 1, (500, 2)).tolist())}
+        # Points on cell edges, where a query box may end just inside the next column
+        points.update({1000: (0.0, 0.0), 1001: (0.05, 0.1), 1002: (10.0, 10.0)})
+        for owner, point in points.items():
+            index.insert(owner, [point])
+        for lat, lng, radius_km in [(0.0, 0.0, 1), (10.0, 10.0, 1), (0.3, -0.2, 5), (0.049, 0.1, 0.5), (0.0, 0.0, 50)]:
+            with self.subTest(lat=lat, lng=lng, radius_km=radius_km):
+                expected = {
+                    owner for owner, (point_lat, point_lng) in points.items()
+                    if haversine_km(lat, lng, point_lat, point_lng) <= radius_km
+                }
+                self.assertTrue(expected)
+                self.assertEqual(set(index.within(lat, lng, radius_km)), expected)
+
+
+class SpatialIndexTests(TestCase):
+    def test_rolled_back_delete_keeps_project(self):
+        user = User.objects.create(username='planner')
+        project = RoadProject.objects.create(name='Junction', created_by=user, latitude=10.0, longitude=10.0)
+        project_id = project.pk
+        self.assertEqual([pk for pk, _ in project_index.nearest(10.0, 10.0, 1)], [project_id])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    project.delete()
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual([pk for pk, _ in project_index.nearest(10.0, 10.0, 1)], [project_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoadProject.objects.get(pk=project_id).delete()
+        self.assertEqual(project_index.nearest(10.0, 10.0, 1), [])
+
+
+class TileTests(TestCase):
+    def test_postgis_needs_the_extension(self):
+        # Asked for, but SQLite has no PostGIS: tiles come from the Python encoder
+        with override_settings(TILES_USE_POSTGIS=True):
+            self.assertFalse(tiles.use_postgis())
+
+    @override_settings(TILES_USE_POSTGIS=True)
+    def test_tiles_without_postgis(self):
+        user = User.objects.create(username='mapper')
+        RoadProject.objects.create(
+            name='Malformed', created_by=user, polyline_coordinates=[[1.0, 1.0], 'x', [95.0, 1.0], [1.05, 1.1]],
+        )
+        clear_caches()
+        self.assertFalse(tiles.use_postgis())
+        response = APIClient().get('/api/tiles/projects/6/32/31.mvt')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Malformed', response.content)
+
+
+class ApiTestCase(TestCase):
+    """Projects with segments, photos, updates and assignees, read by an authenticated client"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'user{index}') for index in range(3)]
+        for index in range(25):
+            project = RoadProject.objects.create(
+                name=f'Project {index}', created_by=cls.users[index % 3],
+                latitude=1.0, longitude=1.0, polyline_coordinates=[[1.0, 1.0], [1.1, 1.1]],
+            )
+            project.assigned_to.set(cls.users[:2])
+            RoadSegment.objects.create(
+                project=project, name=f'Segment {index}', road_type='local', surface_type='gravel',
+                length_km=1, width_m=6,
+            )
+            ProjectUpdate.objects.create(project=project, title='Update', content='Done', created_by=cls.users[index % 3])
+        # bulk_create: saving photos queues image processing, which these tests do not need
+        ProjectPhoto.objects.bulk_create([
+            ProjectPhoto(project=project, title=f'Photo {index}', image=f'photo{index}.jpg', uploaded_by=cls.users[index % 3])
+            for index, project in enumerate(RoadProject.objects.all())
+        ])
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+
+class QueryCountTests(ApiTestCase):
+    """A page or object costs the same number of queries whatever the page size"""
+    page_sizes = [2, 20]
+
+    def assertQueries(self, base, queries):
+        for size in self.page_sizes:
+            with self.subTest(base=base, page_size=size):
+                clear_caches()
+                with self.assertNumQueries(queries):
+                    response = self.client.get(f'/api/{base}/', {'page_size': size})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), size)
+        for item in response.data['results'][:self.page_sizes[0]]:
+            with self.subTest(base=base, pk=item['id']):
+                clear_caches()
+                with self.assertNumQueries(queries):
+                    response = self.client.get(f'/api/{base}/{item["id"]}/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_projects(self):
+        # Collection version, page with creator joined, assignees prefetched
+        self.assertQueries('projects', 3)
+
+    def test_segments(self):
+        self.assertQueries('segments', 2)
+
+    def test_photos(self):
+        self.assertQueries('photos', 2)
+
+    def test_updates(self):
+        self.assertQueries('updates', 2)
+
+
+class SparseFieldsetTests(ApiTestCase):
+    """?fields= and ?omit= return the full representation with only the other fields dropped"""
+    fieldsets = {
+        'projects': [
+            {'fields': 'id,name'},
+            {'fields': 'created_by_name,assigned_to_names,polyline_coordinates'},
+            {'omit': 'assigned_to,assigned_to_names,polyline_coordinates'},
+        ],
+        'segments': [{'fields': 'id,length_km'}, {'omit': 'project,name'}],
+        'photos': [{'fields': 'thumbnails,uploaded_by_name'}, {'omit': 'image,project'}],
+        'updates': [{'fields': 'content,created_by_name'}, {'omit': 'created_by_name'}],
+    }
+
+    def get(self, url, params=None):
+        clear_caches()
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertSparse(self, full, sparse, params):
+        if 'fields' in params:
+            expected = {name: full[name] for name in params['fields'].split(',')}
+        else:
+            expected = {name: value for name, value in full.items() if name not in params['omit'].split(',')}
+        self.assertEqual(sparse, expected)
+
+    def test_matches_full_representation(self):
+        for base, fieldsets in self.fieldsets.items():
+            full = self.get(f'/api/{base}/', {'page_size': 10})['results']
+            for params in fieldsets:
+                with self.subTest(base=base, **params):
+                    sparse = self.get(f'/api/{base}/', dict(params, page_size=10))['results']
+                    self.assertEqual(len(sparse), len(full))
+                    for full_item, sparse_item in zip(full, sparse):
+                        self.assertSparse(full_item, sparse_item, params)
+                    self.assertSparse(full[0], self.get(f'/api/{base}/{full[0]["id"]}/', params), params)
+
+    def test_unknown_field(self):
+        self.assertEqual(self.client.get('/api/projects/', {'fields': 'id,nonexistent'}).status_code, 400)
+
+
+class FastPathTests(ApiTestCase):
+    """?fast=1 builds the same project pages as RoadProjectSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Values the formatting differs on: decimals, dates, no location, long and empty polylines
+        road = [[45.0 + index * 0.001, 7.0 + math.sin(index / 5) * 0.002] for index in range(400)]
+        RoadProject.objects.create(
+            name='Mountain pass', description='Switchbacks', created_by=cls.users[1], budget='1234.5',
+            start_date=datetime.date(2024, 3, 1), priority='high', polyline_coordinates=road,
+        )
+        RoadProject.objects.create(name='Unplaced', created_by=cls.users[2], status='on_hold', polyline_coordinates=[])
+
+    def assertSamePages(self, params):
+        clear_caches()
+        serialized = self.client.get('/api/projects/', dict(params, page_size=50))
+        clear_caches()
+        fast = self.client.get('/api/projects/', dict(params, page_size=50, fast=1))
+        self.assertEqual(serialized.status_code, 200)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.json(), serialized.json())
+
+    def test_matches_serializer(self):
+        for params in [
+            {},
+            {'zoom': 8},
+            {'zoom': 16},
+            {'simplify': 25},
+            {'geometry_format': 'encoded'},
+            {'geometry_format': 'encoded', 'zoom': 10},
+            {'status': 'on_hold'},
+            {'fields': 'id,budget,start_date,assigned_to_names,polyline_coordinates'},
+            {'omit': 'polyline_coordinates'},
+        ]:
+            with self.subTest(**params):
+                self.assertSamePages(params)
+
+
+class CorridorTests(TestCase):
+    """The indexed corridor query finds what measuring every photo and project against the road finds"""
+
+    @classmethod
+    def setUpTestData(cls):
+        random = np.random.RandomState(25)
+        user = User.objects.create(username='surveyor')
+        lats = np.linspace(50.0, 50.15, 40)
+        cls.road = np.column_stack([lats, 8.0 + 0.02 * np.sin(lats * 60)])
+        cls.project = RoadProject.objects.create(name='Valley road', created_by=user, polyline_coordinates=cls.road.tolist())
+
+        points = np.column_stack([random.uniform(49.98, 50.17, 3000), random.uniform(7.95, 8.05, 3000)])
+        photos = []
+        for index, (lat, lng) in enumerate(points.tolist()):
+            photo = ProjectPhoto(
+                project=cls.project, title=f'Photo {index}', image=f'photo{index}.jpg', uploaded_by=user,
+                latitude=lat, longitude=lng,
+            )
+            photo.update_grid_cell()
+            photos.append(photo)
+        ProjectPhoto.objects.bulk_create(photos)
+
+        for index in range(60):
+            lat, lng = random.uniform(49.98, 50.17), random.uniform(7.95, 8.05)
+            if index % 3:
+                steps = random.uniform(-0.004, 0.004, (random.randint(2, 5), 2))
+                polyline = (np.array([lat, lng]) + np.cumsum(steps, axis=0)).tolist()
+                RoadProject.objects.create(name=f'Project {index}', created_by=user, polyline_coordinates=polyline)
+            else:
+                RoadProject.objects.create(name=f'Project {index}', created_by=user, latitude=lat, longitude=lng)
+
+    def brute_force_photos(self):
+        rows = np.array(ProjectPhoto.objects.values_list('id', 'latitude', 'longitude'), dtype=float)
+        distances = point_segment_km(rows[:, None, 1:], self.road[None, :-1], self.road[None, 1:]).min(axis=1)
+        return dict(zip(rows[:, 0].astype(int).tolist(), distances.tolist()))
+
+    def brute_force_projects(self):
+        distances = {}
+        for project in RoadProject.objects.exclude(pk=self.project.pk):
+            vertices = polyline_array(project.polyline_coordinates)
+            if len(vertices) < 2:
+                vertices = np.array([[project.latitude, project.longitude]] * 2)
+            distances[project.pk] = float(segment_segment_km(
+                vertices[:-1, None], vertices[1:, None], self.road[None, :-1], self.road[None, 1:]
+            ).min())
+        return distances
+
+    def assertSameHits(self, hits, expected, buffer_km):
+        found = dict(hits)
+        self.assertEqual([distance for _, distance in hits], sorted(distance for _, distance in hits))
+        # The road is cut into shorter pieces for the query, which moves distances by metres at most
+        margin = buffer_km * 0.01
+        self.assertTrue({pk for pk, distance in expected.items() if distance < buffer_km - margin} <= set(found))
+        self.assertTrue(set(found) <= {pk for pk, distance in expected.items() if distance <= buffer_km + margin})
+        for pk, distance in found.items():
+            self.assertAlmostEqual(distance, expected[pk], delta=0.001)
+
+    def test_matches_brute_force(self):
+        photos, projects = self.brute_force_photos(), self.brute_force_projects()
+        for buffer_km in [0.05, 0.3, 2.0]:
+            with self.subTest(buffer_km=buffer_km):
+                photo_hits, project_hits = spatial_backends.get_backend().corridor(self.project, buffer_km)
+                self.assertTrue(photo_hits)
+                self.assertSameHits(photo_hits, photos, buffer_km)
+                self.assertSameHits(project_hits, projects, buffer_km)
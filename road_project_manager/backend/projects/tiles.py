@@ -0,0 +1,317 @@
+"""
+Mapbox Vector Tile (MVT) encoding for the map layers.
+
+Tiles are produced either by a small pure-Python protobuf encoder working
+from the JSON polyline columns, or, when TILES_USE_POSTGIS is set and the
+PostGIS extension is installed, by ST_AsMVT building geometries from the
+same columns in SQL. Both skip the same malformed polyline vertices.
+"""
+import math
+import struct
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from . import geometry_layer, versions
+from .simplify import tolerance_for_zoom
+from .spatial import clip_polyline, mercator, pad_box, polyline_points
+
+CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 22
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+
+CMD_MOVE_TO = 1
+CMD_LINE_TO = 2
+
+
+# Protobuf wire format helpers
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _packed(field, values):
+    return _length_delimited(field, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _key(5, 0) + _varint(value)
+        return _key(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack('<d', value)
+    return _key(1, 2) + _varint(len(str(value).encode())) + str(value).encode()
+
+
+class LayerEncoder:
+    """Accumulates features for one MVT layer"""
+
+    def __init__(self, name, extent=EXTENT):
+        self.name = name
+        self.extent = extent
+        self.features = []
+        self.keys = {}
+        self.values = {}
+
+    def __len__(self):
+        return len(self.features)
+
+    def _tags(self, properties):
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            value_key = (type(value).__name__, value)
+            tags.append(self.keys.setdefault(key, len(self.keys)))
+            tags.append(self.values.setdefault(value_key, len(self.values)))
+        return tags
+
+    def add_point(self, feature_id, point, properties):
+        x, y = point
+        geometry = [(1 << 3) | CMD_MOVE_TO, _zigzag(x), _zigzag(y)]
+        self._add(feature_id, GEOM_POINT, geometry, properties)
+
+    def add_linestrings(self, feature_id, lines, properties):
+        geometry = []
+        cursor_x = cursor_y = 0
+        for line in lines:
+            if len(line) < 2:
+                continue
+            (x, y), rest = line[0], line[1:]
+            geometry += [(1 << 3) | CMD_MOVE_TO, _zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+            geometry.append((len(rest) << 3) | CMD_LINE_TO)
+            for x, y in rest:
+                geometry += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+                cursor_x, cursor_y = x, y
+        if geometry:
+            self._add(feature_id, GEOM_LINESTRING, geometry, properties)
+
+    def _add(self, feature_id, geom_type, geometry, properties):
+        feature = _key(1, 0) + _varint(feature_id)
+        tags = self._tags(properties)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _key(3, 0) + _varint(geom_type)
+        feature += _packed(4, geometry)
+        self.features.append(feature)
+
+    def encode(self):
+        if not self.features:
+            return b''
+        layer = _key(15, 0) + _varint(2)
+        layer += _length_delimited(1, self.name.encode())
+        for feature in self.features:
+            layer += _length_delimited(2, feature)
+        for key in self.keys:
+            layer += _length_delimited(3, key.encode())
+        for _, value in self.values:
+            layer += _length_delimited(4, _encode_value(value))
+        layer += _key(5, 0) + _varint(self.extent)
+        return _length_delimited(3, layer)
+
+
+# Tile geometry
+
+def tile_bounds(z, x, y):
+    """Return (min_lat, min_lng, max_lat, max_lng) covered by a web-mercator tile"""
+    n = 2 ** z
+    min_lng = x / n * 360.0 - 180.0
+    max_lng = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+class TileProjector:
+    """Projects lat/lng onto integer coordinates of one tile"""
+
+    def __init__(self, z, x, y, extent=EXTENT):
+        self.scale = 2 ** z
+        self.x = x
+        self.y = y
+        self.extent = extent
+
+    def __call__(self, lat, lng):
+        world_x, world_y = mercator(lat, lng)
+        return (
+            int(round((world_x * self.scale - self.x) * self.extent)),
+            int(round((world_y * self.scale - self.y) * self.extent)),
+        )
+
+    def line(self, points):
+        projected = []
+        for lat, lng in points:
+            point = self(lat, lng)
+            if not projected or projected[-1] != point:
+                projected.append(point)
+        return projected
+
+
+def _buffered_bounds(z, x, y):
+    return pad_box(tile_bounds(z, x, y), BUFFER / EXTENT)
+
+
+# Layers
+
+def _project_tile_python(z, x, y):
+    from .models import RoadProject
+    box = _buffered_bounds(z, x, y)
+    project = TileProjector(z, x, y)
+    tolerance = tolerance_for_zoom(z)
+    layer = LayerEncoder('projects')
+    projects = RoadProject.objects.filter(
+        bbox_min_lat__lte=box[2], bbox_max_lat__gte=box[0],
+        bbox_min_lng__lte=box[3], bbox_max_lng__gte=box[1],
+    ).only(
+        'id', 'name', 'status', 'priority', 'polyline_color',
+        'latitude', 'longitude', 'polyline_coordinates', 'polyline_levels',
+    )
+    for item in projects.iterator(chunk_size=500):
+        properties = {
+            'name': item.name, 'status': item.status,
+            'priority': item.priority, 'color': item.polyline_color,
+        }
+        points = list(polyline_points(item.polyline_for_tolerance(tolerance)))
+        lines = [project.line(run) for run in clip_polyline(points, [box])] if len(points) >= 2 else []
+        if any(len(line) >= 2 for line in lines):
+            layer.add_linestrings(item.id, lines, properties)
+        elif lines and lines[0]:
+            # Polyline shorter than a tile unit at this zoom
+            layer.add_point(item.id, lines[0][0], properties)
+        elif item.latitude is not None and item.longitude is not None:
+            layer.add_point(item.id, project(item.latitude, item.longitude), properties)
+    return layer.encode()
+
+
+def _photo_tile_python(z, x, y):
+    from .models import ProjectPhoto
+    box = _buffered_bounds(z, x, y)
+    project = TileProjector(z, x, y)
+    layer = LayerEncoder('photos')
+    photos = ProjectPhoto.objects.filter(
+        latitude__range=(box[0], box[2]),
+        longitude__range=(box[1], box[3]),
+    ).values_list('id', 'project_id', 'title', 'latitude', 'longitude')
+    for photo_id, project_id, title, lat, lng in photos.iterator(chunk_size=2000):
+        layer.add_point(photo_id, project(lat, lng), {'project': project_id, 'title': title})
+    return layer.encode()
+
+
+PROJECT_TILE_SQL = """
+WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+features AS (
+    SELECT p.id, p.name, p.status, p.priority, p.polyline_color AS color,
+        COALESCE(line.geom, ST_SetSRID(ST_MakePoint(p.longitude, p.latitude), 4326)) AS geom
+    FROM projects_roadproject p
+    CROSS JOIN LATERAL ({line}) AS line(geom)
+    WHERE p.bbox_min_lat <= %(max_lat)s AND p.bbox_max_lat >= %(min_lat)s
+        AND p.bbox_min_lng <= %(max_lng)s AND p.bbox_max_lng >= %(min_lng)s
+),
+mvt AS (
+    SELECT f.id, f.name, f.status, f.priority, f.color,
+        ST_AsMVTGeom(ST_Transform(f.geom, 3857), bounds.geom, %(extent)s, %(buffer)s, true) AS geom
+    FROM features f, bounds
+    WHERE f.geom IS NOT NULL
+)
+SELECT ST_AsMVT(mvt.*, 'projects', %(extent)s, 'geom', 'id') FROM mvt WHERE mvt.geom IS NOT NULL
+""".replace('{line}', geometry_layer.POLYLINE_GEOM_SQL.format(coordinates='p.polyline_coordinates'))
+
+PHOTO_TILE_SQL = """
+WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+mvt AS (
+    SELECT ph.id, ph.project_id AS project, ph.title,
+        ST_AsMVTGeom(
+            ST_Transform(ST_SetSRID(ST_MakePoint(ph.longitude, ph.latitude), 4326), 3857),
+            bounds.geom, %(extent)s, %(buffer)s, true
+        ) AS geom
+    FROM projects_projectphoto ph, bounds
+    WHERE ph.latitude BETWEEN %(min_lat)s AND %(max_lat)s
+        AND ph.longitude BETWEEN %(min_lng)s AND %(max_lng)s
+)
+SELECT ST_AsMVT(mvt.*, 'photos', %(extent)s, 'geom', 'id') FROM mvt WHERE mvt.geom IS NOT NULL
+"""
+
+
+def _postgis_tile(sql, z, x, y):
+    min_lat, min_lng, max_lat, max_lng = _buffered_bounds(z, x, y)
+    params = {
+        'z': z, 'x': x, 'y': y, 'extent': EXTENT, 'buffer': BUFFER,
+        'min_lat': min_lat, 'min_lng': min_lng, 'max_lat': max_lat, 'max_lng': max_lng,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+LAYERS = {
+    'projects': (_project_tile_python, PROJECT_TILE_SQL),
+    'photos': (_photo_tile_python, PHOTO_TILE_SQL),
+}
+
+
+_use_postgis = {}
+
+
+def use_postgis():
+    """TILES_USE_POSTGIS on a database with the PostGIS extension installed; checked once per process"""
+    enabled = getattr(settings, 'TILES_USE_POSTGIS', False)
+    if enabled not in _use_postgis:
+        _use_postgis[enabled] = enabled and geometry_layer.available(connection)
+    return _use_postgis[enabled]
+
+
+# Cache: keys embed the version of the collection a layer draws (versions.py). The
+# counters live in the database and are bumped in the writing transaction, so every
+# worker switches to new keys when the change commits, and never before.
+LAYER_COLLECTIONS = {'projects': 'projects', 'photos': 'photos'}
+
+
+def layer_version(layer):
+    """Version to key a layer's cached data with; read it before the rows it is cached with"""
+    collection = LAYER_COLLECTIONS[layer]
+    return versions.current([collection])[0][collection]
+
+
+def render_tile(layer, z, x, y):
+    """Return the encoded tile bytes for a layer, served from the cache when fresh"""
+    python_builder, sql = LAYERS[layer]
+    key = f'tiles:{layer}:{layer_version(layer)}:{z}/{x}/{y}'
+    data = cache.get(key)
+    if data is None:
+        data = _postgis_tile(sql, z, x, y) if use_postgis() else python_builder(z, x, y)
+        cache.set(key, data, getattr(settings, 'TILE_CACHE_TIMEOUT', 3600))
+    return data
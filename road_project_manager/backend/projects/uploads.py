@@ -0,0 +1,222 @@
+"""
+Resumable chunked photo uploads.
+
+  POST   photo-uploads/                 photo fields + filename, size (and optionally sha256)
+  PUT    photo-uploads/<id>/            raw bytes, starting at the Upload-Offset header (or ?offset=)
+  HEAD   photo-uploads/<id>/            Upload-Offset says where to resume after a dropped link
+  POST   photo-uploads/<id>/finalize/   hash, deduplicate and create the ProjectPhoto
+
+Chunks are copied from the request stream straight into a staging file
+in blocks, so neither a chunk nor the whole photo is held in memory, and
+the finished file is copied to the default storage in blocks. The staging
+file is only removed once the photo is committed, so a finalize that
+fails can be retried. Staging lives on local disk because storages cannot
+append; with several app servers point PHOTO_UPLOAD_STAGING_DIR at a
+shared volume.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from PIL import Image
+
+from .models import PhotoUpload, ProjectPhoto
+from .storage import photo_storage
+
+BLOCK_SIZE = 1024 * 1024
+FORMAT_ALIASES = {'MPO': 'JPEG'}
+PREFERRED_EXTENSIONS = {'JPEG': '.jpg', 'TIFF': '.tif'}
+
+
+class UploadError(ValueError):
+    """The chunk or upload cannot be accepted; the message is safe to show to the client"""
+
+
+class OffsetMismatch(UploadError):
+    """A chunk did not start where the upload currently ends"""
+
+    def __init__(self, received):
+        super().__init__(f"Chunk must start at offset {received}")
+        self.received = received
+
+
+def staging_path(upload):
+    return os.path.join(settings.PHOTO_UPLOAD_STAGING_DIR, f'{upload.pk}.part')
+
+
+def discard(upload):
+    """Remove the staging file of an upload"""
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as staged:
+        for block in iter(lambda: staged.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def existing_photo(project_id, content_hash):
+    if not content_hash:
+        return None
+    return ProjectPhoto.objects.filter(project_id=project_id, content_hash=content_hash).order_by('id').first()
+
+
+def _stored_size_matches(name, size):
+    try:
+        return photo_storage.size(name) == size
+    except OSError:
+        return False
+
+
+def skip_transfer(upload, user):
+    """
+    Complete an upload whose declared sha256 is already stored, without any
+    bytes being sent: reuse the project's identical photo, or create one on
+    the blob another project already stored. Returns the photo or None, in
+    which case the bytes are uploaded as usual.
+    """
+    if not upload.sha256:
+        return None
+    photo = existing_photo(upload.project_id, upload.sha256)
+    blob = photo.image.name if photo is not None else (
+        ProjectPhoto.objects.filter(content_hash=upload.sha256, image__contains=upload.sha256)
+        .order_by('id').values_list('image', flat=True).first()
+    )
+    # The declared size must match too, or received would not describe the stored bytes
+    if blob is None or not _stored_size_matches(blob, upload.size):
+        return None
+    if photo is None:
+        photo = ProjectPhoto.objects.create(
+            project_id=upload.project_id, title=upload.title, description=upload.description,
+            latitude=upload.latitude, longitude=upload.longitude, uploaded_by=user, image=blob,
+        )
+    upload.photo = photo
+    upload.received = upload.size
+    upload.save(update_fields=['photo', 'received', 'updated_at'])
+    return photo
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Append length bytes read from stream at offset; returns the new upload end.
+
+    Retries resend the same bytes for the same offset, so two requests
+    racing for one range write identical data; only the first to move
+    `received` forward succeeds and the other gets OffsetMismatch.
+    """
+    if upload.photo_id is not None:
+        raise UploadError("Upload is already finalized")
+    if offset != upload.received:
+        raise OffsetMismatch(upload.received)
+    if length > settings.PHOTO_UPLOAD_MAX_CHUNK:
+        raise UploadError(f"Chunks are limited to {settings.PHOTO_UPLOAD_MAX_CHUNK} bytes")
+    if offset + length > upload.size:
+        raise UploadError(f"Chunk ends past the declared size of {upload.size} bytes")
+
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as staged:
+        staged.seek(offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                # Link dropped mid-chunk: keep what arrived so the client resumes from there
+                break
+            staged.write(block)
+            written += len(block)
+    end = offset + written
+    moved = PhotoUpload.objects.filter(pk=upload.pk, received=offset, photo__isnull=True).update(received=end)
+    if not moved:
+        upload.refresh_from_db(fields=['received'])
+        raise OffsetMismatch(upload.received)
+    upload.received = end
+    return end
+
+
+def restart(upload):
+    discard(upload)
+    upload.received = 0
+    upload.save(update_fields=['received', 'updated_at'])
+
+
+def _check(path, expected_hash):
+    """Hash and identify the staged file; returns (content_hash, image format, problem)"""
+    content_hash = file_hash(path)
+    if expected_hash and expected_hash.lower() != content_hash:
+        return content_hash, None, "File does not match the declared sha256; upload restarted"
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except Exception:
+        return content_hash, None, "Upload is not a valid image; upload restarted"
+    return content_hash, image_format, None
+
+
+def _format(image_format):
+    # Pillow reads multi-picture JPEGs (most phone photos) as MPO
+    return FORMAT_ALIASES.get(image_format, image_format)
+
+
+def stored_name(filename, image_format):
+    """Base name to store an upload under, with an extension matching the image content"""
+    name, extension = os.path.splitext(os.path.basename(filename))
+    image_format = _format(image_format)
+    registered = Image.registered_extensions()
+    if _format(registered.get(extension.lower())) != image_format:
+        # Never keep an extension the content does not back (e.g. .html), or it is served as such
+        extensions = [ext for ext, known in registered.items() if known == image_format]
+        extension = PREFERRED_EXTENSIONS.get(image_format) or (extensions or ['.' + image_format.lower()])[0]
+    return name + extension
+
+
+def finalize(upload, user):
+    """
+    Turn a complete upload into a ProjectPhoto; returns (photo, created).
+
+    When the project already has a photo with the same content, that photo
+    is returned instead of storing a second copy. Finalizing twice returns
+    the photo from the first call.
+    """
+    with transaction.atomic():
+        # Serializes concurrent finalize calls for the same upload
+        upload = PhotoUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.photo_id is not None:
+            return upload.photo, False
+        if upload.received != upload.size:
+            raise UploadError(f"Upload is incomplete: {upload.received} of {upload.size} bytes received")
+
+        path = staging_path(upload)
+        if not os.path.exists(path):
+            problem = "Uploaded data is no longer available; upload restarted"
+        else:
+            content_hash, image_format, problem = _check(path, upload.sha256)
+        if problem is None:
+            photo = existing_photo(upload.project_id, content_hash)
+            created = photo is None
+            if created:
+                photo = ProjectPhoto(
+                    project_id=upload.project_id, title=upload.title, description=upload.description,
+                    latitude=upload.latitude, longitude=upload.longitude,
+                    uploaded_by=user, content_hash=content_hash,
+                )
+                # Copied, not moved: if anything below fails the staged file is still there to retry
+                with File(open(path, 'rb'), name=path) as staged:
+                    staged.content_hash = content_hash
+                    photo.image.save(stored_name(upload.filename, image_format), staged, save=False)
+                photo.save()
+            upload.photo = photo
+            upload.save(update_fields=['photo', 'updated_at'])
+            transaction.on_commit(lambda: discard(upload))
+    if problem is not None:
+        restart(upload)
+        raise UploadError(problem)
+    return photo, created
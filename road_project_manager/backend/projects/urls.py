@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -6,10 +6,15 @@ router = DefaultRouter()
 router.register(r'projects', views.RoadProjectViewSet)
 router.register(r'segments', views.RoadSegmentViewSet)
 router.register(r'photos', views.ProjectPhotoViewSet)
+router.register(r'photo-uploads', views.PhotoUploadViewSet, basename='photoupload')
 router.register(r'updates', views.ProjectUpdateViewSet)
 
 urlpatterns = [
+    re_path(r'^projects/export\.(?P<export_format>geojson|ndjson)$', views.RoadProjectViewSet.as_view({'get': 'export'}), name='project_export'),
     path('', include(router.urls)),
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', views.VectorTileView.as_view(), name='vector_tile'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache_stats'),
     # Authentication endpoints
     path('auth/login/', views.login_view, name='api_login'),
     path('auth/logout/', views.logout_view, name='api_logout'),
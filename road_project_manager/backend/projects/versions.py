@@ -0,0 +1,40 @@
+"""
+Per-collection version counters.
+
+Model signals bump a collection's counter on every save or delete, inside
+the writing transaction, so a response's ETag can be computed from one
+small query instead of from the serialized body. The counters live in the
+database so every worker process sees the same value.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CollectionVersion
+
+
+def bump(*names):
+    now = timezone.now()
+    updated = CollectionVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=now)
+    if updated < len(names):
+        for name in names:
+            CollectionVersion.objects.get_or_create(name=name, defaults={'version': 1, 'updated_at': now})
+
+
+def current(names):
+    """Return ({name: version}, latest change time or None) for the named collections"""
+    rows = CollectionVersion.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    versions = {name: 0 for name in names}
+    last_modified = None
+    for name, version, updated_at in rows:
+        versions[name] = version
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def etag(versions, *parts):
+    """Strong ETag for a representation built from these collection versions"""
+    key = '|'.join([','.join(f'{name}:{version}' for name, version in sorted(versions.items())), *parts])
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
@@ -1,43 +1,127 @@
 from rest_framework import viewsets, permissions, status
+from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, RetrieveModelMixin
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotAuthenticated, ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import RoadProject, RoadSegment, ProjectPhoto, ProjectUpdate
+from . import clustering, export, fastpath, fragments, rollups, spatial_backends, sync, tiles, uploads
+from .mixins import BulkMixin, ConditionalGetMixin, ResponseCacheMixin, SparseFieldsetMixin
+from .simplify import tolerance_for_meters, tolerance_for_zoom
+from .spatial import pad_box, parse_bbox, polyline_points
+from .pagination import KeysetPagination
+from .models import RoadProject, RoadSegment, ProjectPhoto, PhotoUpload, ProjectUpdate
 from .serializers import (
     RoadProjectSerializer, RoadSegmentSerializer,
-    ProjectPhotoSerializer, ProjectUpdateSerializer
+    ProjectPhotoSerializer, PhotoUploadSerializer, ProjectUpdateSerializer, represent_variant
 )
 
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 500
+IN_BBOX_DEFAULT_LIMIT = 1000
+IN_BBOX_MAX_LIMIT = 5000
+IN_BBOX_CLIP_PADDING = 0.1  # Fraction of the viewport kept around it when clipping
+CORRIDOR_DEFAULT_BUFFER_M = 50
+CORRIDOR_MAX_BUFFER_M = 5000
+CORRIDOR_DEFAULT_LIMIT = 100
+CORRIDOR_MAX_LIMIT = 5000
+SIMPLIFIED_ACTIONS = ['list', 'nearby', 'in_bbox']
+GEOMETRY_FORMATS = ['json', 'encoded']
 
-class RoadProjectViewSet(viewsets.ModelViewSet):
+
+class RoadProjectViewSet(ConditionalGetMixin, ResponseCacheMixin, BulkMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = RoadProject.objects.all()
     serializer_class = RoadProjectSerializer
     permission_classes = [permissions.AllowAny]  # Allow unauthenticated access for POC
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'priority', 'created_by']
+    pagination_class = KeysetPagination
+    select_related_fields = ['created_by']
+    # Ordered so assigned_to lists match the fast path's
+    prefetch_related_fields = [Prefetch('assigned_to', queryset=User.objects.order_by('id'))]
+    unrelated_actions = ['destroy', 'segments', 'photos', 'export', 'bulk', 'stats']
+    sparse_actions = ['list', 'retrieve', 'nearby', 'in_bbox']
+    version_collections = ['projects']
+    action_version_collections = {
+        'segments': ['segments'], 'photos': ['photos'], 'stats': ['projects', 'segments'],
+        'corridor': ['projects', 'photos'],
+    }
 
-    def perform_create(self, serializer):
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in SIMPLIFIED_ACTIONS:
+            context['polyline_tolerance'] = self.get_polyline_tolerance()
+        context['polyline_clip_boxes'] = getattr(self, 'polyline_clip_boxes', None)
+        geometry_format = self.request.query_params.get('geometry_format', 'json')
+        if geometry_format not in GEOMETRY_FORMATS:
+            raise ValidationError({'error': f"geometry_format must be one of {', '.join(GEOMETRY_FORMATS)}"})
+        context['geometry_format'] = geometry_format
+        return context
+
+    def get_polyline_tolerance(self):
+        """Tolerance in degrees from ?zoom= (map zoom) or ?simplify= (metres), None for full detail"""
+        zoom = self.request.query_params.get('zoom')
+        simplify = self.request.query_params.get('simplify')
+        try:
+            if zoom not in (None, ''):
+                return tolerance_for_zoom(min(max(int(zoom), 0), 24))
+            if simplify not in (None, ''):
+                meters = float(simplify)
+                return tolerance_for_meters(meters) if meters > 0 else None
+        except ValueError:
+            raise ValidationError({'error': 'zoom must be an integer and simplify a number of metres'})
+        return None
+
+    def get_creator(self):
         # For POC: handle anonymous users by creating/using a default user
         if self.request.user.is_authenticated:
-            serializer.save(created_by=self.request.user)
-        else:
-            from django.contrib.auth.models import User
-            # Get or create a default user for POC testing
-            default_user, created = User.objects.get_or_create(
+            return self.request.user
+        if not hasattr(self, '_poc_user'):
+            # Get or create a default user for POC testing, once per request
+            self._poc_user, created = User.objects.get_or_create(
                 username='poc_user',
                 defaults={'email': 'poc@example.com', 'first_name': 'POC', 'last_name': 'User'}
             )
-            serializer.save(created_by=default_user)
+        return self._poc_user
+
+    def use_fast_path(self):
+        return self.request.query_params.get('fast', '').lower() in ('1', 'true', 'yes')
+
+    def list(self, request, *args, **kwargs):
+        """?fast=1 builds the page from .values() rows instead of RoadProjectSerializer"""
+        if not self.use_fast_path():
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(self.fast_list, request, *args, **kwargs)
+
+    def fast_list(self, request, *args, **kwargs):
+        context = self.get_serializer_context()
+        queryset = fastpath.rows(self.filter_queryset(self.get_queryset()), context)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fastpath.represent(page, context))
+        return Response(fastpath.represent(queryset, context))
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.get_creator())
+
+    def get_bulk_create_kwargs(self):
+        return {'created_by': self.get_creator()}
+
+    def prepare_bulk_instance(self, instance):
+        return instance.refresh_derived_fields()
 
     @action(detail=False, methods=['get'])
     def nearby(self, request):
-        """Get projects near a specific location"""
+        """Get projects near a specific location, closest first"""
         lat = request.query_params.get('lat')
         lng = request.query_params.get('lng')
         radius = request.query_params.get('radius', 10)  # Default 10km
+        limit = request.query_params.get('limit', NEARBY_DEFAULT_LIMIT)
 
         if not lat or not lng:
             return Response(
@@ -46,77 +130,410 @@ class RoadProjectViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            # Simple distance calculation (not precise, but works for testing)
             lat_float = float(lat)
             lng_float = float(lng)
             radius_float = float(radius)
+            limit_int = min(int(limit), NEARBY_MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid coordinates'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            # Simple bounding box calculation (approximately 1 degree = 111km)
-            lat_delta = radius_float / 111.0
-            lng_delta = radius_float / 111.0
+        if not (-90 <= lat_float <= 90 and -180 <= lng_float <= 180) or radius_float <= 0 or limit_int <= 0:
+            return Response(
+                {'error': 'Invalid coordinates'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Indexed prefilter and exact distances, by PostGIS or the in-process grid index
+        hits = spatial_backends.get_backend().nearest_projects(lat_float, lng_float, radius_float, limit_int)
+        distances = dict(hits)
+        projects = self.get_queryset().filter(id__in=distances)
+        projects = sorted(projects, key=lambda project: (distances[project.id], project.id))
 
-            projects = RoadProject.objects.filter(
-                latitude__isnull=False,
-                longitude__isnull=False,
-                latitude__range=[lat_float - lat_delta, lat_float + lat_delta],
-                longitude__range=[lng_float - lng_delta, lng_float + lng_delta]
+        serializer = self.get_serializer(projects, many=True)
+        data = serializer.data
+        for item, project in zip(data, projects):
+            item['distance_km'] = round(distances[project.id], 3)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def in_bbox(self, request):
+        """Get projects intersecting a map viewport (bbox=minLng,minLat,maxLng,maxLat)"""
+        bbox = request.query_params.get('bbox')
+        limit = request.query_params.get('limit', IN_BBOX_DEFAULT_LIMIT)
+        clip = request.query_params.get('clip', '').lower() in ('1', 'true', 'yes')
+
+        if not bbox:
+            return Response(
+                {'error': 'bbox parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            serializer = self.get_serializer(projects, many=True)
-            return Response(serializer.data)
+        try:
+            boxes = parse_bbox(bbox)
+            limit_int = min(int(limit), IN_BBOX_MAX_LIMIT)
         except ValueError:
             return Response(
-                {'error': 'Invalid coordinates'},
+                {'error': 'bbox must be minLng,minLat,maxLng,maxLat'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        projects = spatial_backends.get_backend().projects_in_boxes(self.filter_queryset(self.get_queryset()), boxes)
+        projects = projects[:max(limit_int, 0)]
+
+        if clip:
+            # Leaflet multi-polyline format: a list of runs inside the padded viewport
+            self.polyline_clip_boxes = [pad_box(box, IN_BBOX_CLIP_PADDING) for box in boxes]
+        serializer = self.get_serializer(projects, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def corridor(self, request, pk=None):
+        """
+        Photos and other projects within ?buffer= metres (default 50) of this
+        project's polyline, closest first, each list cut to ?limit= items
+        """
+        buffer = request.query_params.get('buffer', CORRIDOR_DEFAULT_BUFFER_M)
+        limit = request.query_params.get('limit', CORRIDOR_DEFAULT_LIMIT)
+
+        try:
+            buffer_float = float(buffer)
+            limit_int = min(int(limit), CORRIDOR_MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'buffer and limit must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not 0 < buffer_float <= CORRIDOR_MAX_BUFFER_M or limit_int < 0:
+            return Response(
+                {'error': f'buffer must be between 0 and {CORRIDOR_MAX_BUFFER_M} metres and limit not negative'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        project = self.get_object()
+        if len(list(polyline_points(project.polyline_coordinates))) < 2:
+            return Response(
+                {'error': 'Project has no polyline'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Indexed prefilter and exact distances to the polyline, by PostGIS or NumPy
+        photo_hits, project_hits = spatial_backends.get_backend().corridor(project, buffer_float / 1000.0)
+
+        photo_distances = dict(photo_hits[:limit_int])
+        photos = ProjectPhoto.objects.filter(id__in=photo_distances).select_related('uploaded_by')
+        photos = sorted(photos, key=lambda photo: (photo_distances[photo.id], photo.id))
+        photo_data = ProjectPhotoSerializer(photos, many=True, context=self.get_serializer_context()).data
+        for item, photo in zip(photo_data, photos):
+            item['distance_m'] = round(photo_distances[photo.id] * 1000, 1)
+
+        project_distances = dict(project_hits[:limit_int])
+        projects = self.get_queryset().filter(id__in=project_distances)
+        projects = sorted(projects, key=lambda other: (project_distances[other.id], other.id))
+        project_data = self.get_serializer(projects, many=True).data
+        for item, other in zip(project_data, projects):
+            item['distance_m'] = round(project_distances[other.id] * 1000, 1)
+
+        return Response({
+            'project': project.id,
+            'buffer_m': buffer_float,
+            'photo_count': len(photo_hits),
+            'photos': photo_data,
+            'project_count': len(project_hits),
+            'projects': project_data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Dashboard totals: project counts and budget by status and priority, segment
+        counts and length by road and surface type. Read from the rollup table
+        unless filtered (status, priority, created_by), which aggregates instead.
+        """
+        if any(name in request.query_params for name in self.filterset_fields):
+            projects = self.filter_queryset(self.get_queryset())
+            segments = RoadSegment.objects.filter(project__in=projects.values('pk'))
+            return Response(rollups.aggregate(projects, segments))
+        return Response(rollups.stats())
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Project centroids clustered for a map viewport (bbox=minLng,minLat,maxLng,maxLat
+        and zoom), with per-status counts; single projects come back as count 1
+        """
+        bbox = request.query_params.get('bbox')
+        zoom = request.query_params.get('zoom')
+
+        if not bbox or zoom is None:
+            return Response(
+                {'error': 'bbox and zoom parameters are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            boxes = parse_bbox(bbox)
+            zoom_int = int(zoom)
+        except ValueError:
+            return Response(
+                {'error': 'bbox must be minLng,minLat,maxLng,maxLat and zoom an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= zoom_int <= tiles.MAX_ZOOM:
+            return Response(
+                {'error': f'zoom must be between 0 and {tiles.MAX_ZOOM}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        clusters = clustering.project_clusters.clusters(boxes, zoom_int)
+        return Response({'zoom': zoom_int, 'count': sum(cluster['count'] for cluster in clusters), 'clusters': clusters})
+
+    def export(self, request, export_format='geojson'):
+        """
+        Stream every (filtered) project as a GeoJSON FeatureCollection or NDJSON.
+        Routed explicitly in urls.py as projects/export.geojson and .ndjson.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        response = StreamingHttpResponse(
+            export.STREAMS[export_format](queryset),
+            content_type=export.CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="projects.{export_format}"'
+        return response
+
     @action(detail=True, methods=['get'])
     def segments(self, request, pk=None):
-        """Get all road segments for a project"""
+        """Get the road segments for a project, one page at a time"""
         project = self.get_object()
-        segments = project.road_segments.all()
-        serializer = RoadSegmentSerializer(segments, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(project.road_segments.all())
+        serializer = RoadSegmentSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def photos(self, request, pk=None):
-        """Get all photos for a project"""
+        """Get the photos for a project, one page at a time"""
         project = self.get_object()
-        photos = project.photos.all()
-        serializer = ProjectPhotoSerializer(photos, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(project.photos.select_related('uploaded_by'))
+        serializer = ProjectPhotoSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
-class RoadSegmentViewSet(viewsets.ModelViewSet):
+class RoadSegmentViewSet(ConditionalGetMixin, BulkMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = RoadSegment.objects.all()
     serializer_class = RoadSegmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['project', 'road_type', 'surface_type']
+    pagination_class = KeysetPagination
+    version_collections = ['segments']
 
 
-class ProjectPhotoViewSet(viewsets.ModelViewSet):
+class ProjectPhotoViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = ProjectPhoto.objects.all()
     serializer_class = ProjectPhotoSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['project']
+    pagination_class = KeysetPagination
+    select_related_fields = ['uploaded_by']
+    version_collections = ['photos']
 
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Clustered photo markers for a map viewport: bbox=minLng,minLat,maxLng,maxLat
+        and zoom (the map's zoom level), optionally project=<id>
+        """
+        bbox = request.query_params.get('bbox')
+        zoom = request.query_params.get('zoom')
+        project = request.query_params.get('project')
+
+        if not bbox or zoom is None:
+            return Response(
+                {'error': 'bbox and zoom parameters are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            boxes = parse_bbox(bbox)
+            zoom_int = int(zoom)
+            project_id = int(project) if project else None
+        except ValueError:
+            return Response(
+                {'error': 'bbox must be minLng,minLat,maxLng,maxLat; zoom and project integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= zoom_int <= tiles.MAX_ZOOM:
+            return Response(
+                {'error': f'zoom must be between 0 and {tiles.MAX_ZOOM}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            clusters = clustering.photo_clusters(boxes, zoom_int, project_id, self.version_current.get('photos'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        data = []
+        for cluster in clusters:
+            thumbnail = cluster['thumbnail']
+            data.append(dict(cluster, thumbnail=represent_variant(thumbnail, request) if thumbnail else None))
+        return Response({'zoom': zoom_int, 'count': sum(cluster['count'] for cluster in data), 'clusters': data})
+
+
+class PhotoUploadViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked photo uploads for field devices on flaky links; see
+    projects/uploads.py for the protocol. The current end of the upload is
+    returned in the Upload-Offset header.
+    """
+    serializer_class = PhotoUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PhotoUpload.objects.filter(created_by=self.request.user)
+
+    def offset_response(self, upload, status_code=status.HTTP_200_OK):
+        return Response(
+            self.get_serializer(upload).data, status=status_code,
+            headers={'Upload-Offset': str(upload.received)}
+        )
 
-class ProjectUpdateViewSet(viewsets.ModelViewSet):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(created_by=request.user)
+        # Content the server already has needs no transfer; the upload comes back finished
+        if uploads.skip_transfer(upload, request.user) is not None:
+            return self.offset_response(upload)
+        return self.offset_response(upload, status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.offset_response(self.get_object())
+
+    def update(self, request, *args, **kwargs):
+        """Store one chunk: the raw request body, starting at Upload-Offset (or ?offset=)"""
+        upload = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset')))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            offset, length = None, 0
+        if offset is None or offset < 0 or length <= 0:
+            return Response(
+                {'error': 'A non-empty body and an Upload-Offset header (or ?offset=) are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            # Read the body as a stream; request.data would buffer the whole chunk
+            uploads.write_chunk(upload, offset, request.stream, length)
+        except uploads.OffsetMismatch as exc:
+            return Response(
+                {'error': str(exc), 'received': exc.received}, status=status.HTTP_409_CONFLICT,
+                headers={'Upload-Offset': str(exc.received)}
+            )
+        except uploads.UploadError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.offset_response(upload)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Create the photo once every byte is in; returns it (200 if it already existed)"""
+        try:
+            photo, created = uploads.finalize(self.get_object(), request.user)
+        except uploads.UploadError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ProjectPhotoSerializer(photo, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class ProjectUpdateViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = ProjectUpdate.objects.all()
     serializer_class = ProjectUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['project']
+    pagination_class = KeysetPagination
+    select_related_fields = ['created_by']
+    version_collections = ['updates']
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
+class VectorTileView(APIView):
+    """Serve Mapbox Vector Tiles for the map layers"""
+
+    def get_permissions(self):
+        # Project geometry is public like RoadProjectViewSet; photos need a login
+        if self.kwargs.get('layer') == 'projects':
+            return [permissions.AllowAny()]
+        return [permissions.IsAuthenticated()]
+
+    def get(self, request, layer, z, x, y):
+        if layer not in tiles.LAYERS or not tiles.valid_tile(z, x, y):
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        data = tiles.render_tile(layer, z, x, y)
+        return HttpResponse(data, content_type=tiles.CONTENT_TYPE)
+
+
+class SyncView(APIView):
+    """
+    Changes since a sync token, for offline clients.
+
+    GET /api/sync/?token=<token>&collections=projects,segments&limit=500
+    Without a token every row is returned (paged by limit; keep calling
+    with the returned token while "more" is true).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        names = request.query_params.get('collections')
+        if names:
+            names = [name for name in names.split(',') if name]
+            unknown = [name for name in names if name not in sync.COLLECTIONS]
+            if unknown:
+                return Response(
+                    {'error': f"Unknown collections: {', '.join(unknown)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif request.user.is_authenticated:
+            names = list(sync.COLLECTIONS)
+        else:
+            names = [name for name, collection in sync.COLLECTIONS.items() if collection.public]
+
+        if not request.user.is_authenticated and not all(sync.COLLECTIONS[name].public for name in names):
+            raise NotAuthenticated()
+
+        try:
+            limit = min(int(request.query_params.get('limit', sync.DEFAULT_LIMIT)), sync.MAX_LIMIT)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = sync.changes(names, request.query_params.get('token'), limit, {'request': request})
+        except sync.ExpiredToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+        except sync.InvalidToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of this worker's project fragment cache (staff only)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'fragments': fragments.stats.as_dict()})
+
+
 # Authentication Views
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -138,10 +138,47 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'projects.renderers.ORJSONRenderer',  # ?format=orjson
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+# Caches: "responses" holds serialized list pages, "fragments" single projects; any django-environ cache URL works
+# (locmemcache://, filecache:///path, rediscache://host:6379/1). Local memory evicts LRU entries.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+    'responses': env.cache('RESPONSE_CACHE_URL', default='locmemcache://responses?max_entries=1000'),
+    'fragments': env.cache('FRAGMENT_CACHE_URL', default='locmemcache://fragments?max_entries=50000'),
+}
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=600)
+FRAGMENT_CACHE_TIMEOUT = env.int('FRAGMENT_CACHE_TIMEOUT', default=86400)
+
+# Vector tiles: build tiles with ST_AsMVT when the database has PostGIS
+TILES_USE_POSTGIS = env.bool('TILES_USE_POSTGIS', default=True)
+TILE_CACHE_TIMEOUT = env.int('TILE_CACHE_TIMEOUT', default=3600)
+
+# Incremental sync: tombstones older than this are pruned and older tokens need a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+SYNC_SETTLE_SECONDS = env.int('SYNC_SETTLE_SECONDS', default=2)
+
+# Spatial lookups: "postgis" (geometry tables from projects/geometry_layer.py), "python" (in-process index) or "auto"
+SPATIAL_BACKEND = env('SPATIAL_BACKEND', default='auto')
+
+# Photo pipeline: "process" (process pool), "thread" or "sync"; see projects/photo_pipeline.py
+PHOTO_PIPELINE = env('PHOTO_PIPELINE', default='process')
+PHOTO_PIPELINE_WORKERS = env.int('PHOTO_PIPELINE_WORKERS', default=2)
+PHOTO_VARIANT_SIZES = [int(size) for size in env.list('PHOTO_VARIANT_SIZES', default=['160', '480', '1280'])]
+
+# Resumable photo uploads: chunks are staged on local disk (use a shared volume with several app servers)
+PHOTO_UPLOAD_STAGING_DIR = env('PHOTO_UPLOAD_STAGING_DIR', default=os.path.join(BASE_DIR, 'upload_staging'))
+PHOTO_UPLOAD_MAX_SIZE = env.int('PHOTO_UPLOAD_MAX_SIZE', default=100 * 1024 * 1024)
+PHOTO_UPLOAD_MAX_CHUNK = env.int('PHOTO_UPLOAD_MAX_CHUNK', default=16 * 1024 * 1024)
+PHOTO_UPLOAD_EXPIRY_HOURS = env.int('PHOTO_UPLOAD_EXPIRY_HOURS', default=48)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[
     'http://localhost:3000',  # React dev server
@@ -107,10 +107,54 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Temporarily allow unauthenticated access for POC
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'projects.renderers.ORJSONRenderer',  # ?format=orjson
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+# Caches: "responses" holds serialized list pages and "fragments" single projects, evicting LRU entries
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+RESPONSE_CACHE_TIMEOUT = 600
+FRAGMENT_CACHE_TIMEOUT = 86400
+
+# Vector tiles: SQLite has no PostGIS, use the pure-Python encoder
+TILES_USE_POSTGIS = False
+TILE_CACHE_TIMEOUT = 3600
+
+# Incremental sync
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+SYNC_SETTLE_SECONDS = 2
+
+# Spatial lookups: SQLite has no PostGIS, use the in-process index
+SPATIAL_BACKEND = 'python'
+
+# Photo pipeline: threads only, no process pool in tests
+PHOTO_PIPELINE = 'thread'
+PHOTO_PIPELINE_WORKERS = 2
+PHOTO_VARIANT_SIZES = [160, 480, 1280]
+
+# Resumable photo uploads
+PHOTO_UPLOAD_STAGING_DIR = os.path.join(BASE_DIR, 'upload_staging')
+PHOTO_UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+PHOTO_UPLOAD_MAX_CHUNK = 16 * 1024 * 1024
+PHOTO_UPLOAD_EXPIRY_HOURS = 48
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
@@ -70,8 +70,35 @@ export const projectService = {
     await api.delete(`/projects/${id}/`);
   },
 
-  getNearby: async (lat, lng, radius = 10) => {
-    const response = await api.get(`/projects/nearby/?lat=${lat}&lng=${lng}&radius=${radius}`);
+  getNearby: async (lat, lng, radius = 10, limit = 50) => {
+    const response = await api.get(`/projects/nearby/?lat=${lat}&lng=${lng}&radius=${radius}&limit=${limit}`);
+    return response.data;
+  },
+
+  // fields: optional list of project fields to return, e.g. ['id', 'name', 'status', 'polyline_color', 'polyline_coordinates']
+  getInBbox: async (bounds, zoom, { clip = false, limit = 1000, fields = null } = {}) => {
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(',');
+    const fieldParam = fields ? `&fields=${fields.join(',')}` : '';
+    const response = await api.get(`/projects/in_bbox/?bbox=${bbox}&zoom=${zoom}&clip=${clip}&limit=${limit}${fieldParam}`);
+    return response.data;
+  },
+
+  // Clustered centroids for low zooms: [{latitude, longitude, count, statuses, project, expansion_zoom}]
+  getClusters: async (bounds, zoom) => {
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(',');
+    const response = await api.get(`/projects/clusters/?bbox=${bbox}&zoom=${zoom}`);
+    return response.data;
+  },
+
+  // Dashboard totals by status, priority, road and surface type; filters are status, priority, created_by
+  getStats: async (filters = {}) => {
+    const response = await api.get('/projects/stats/', { params: filters });
+    return response.data;
+  },
+
+  // Photos and other projects within bufferMeters of a project's road, closest first
+  getCorridor: async (projectId, bufferMeters = 50) => {
+    const response = await api.get(`/projects/${projectId}/corridor/`, { params: { buffer: bufferMeters } });
     return response.data;
   },
 
@@ -132,8 +159,33 @@ export const photoService = {
   delete: async (id) => {
     await api.delete(`/photos/${id}/`);
   },
+
+  // Clustered markers for the viewport: [{latitude, longitude, count, bbox, photo, thumbnail}]
+  getClusters: async (bounds, zoom, { project = null } = {}) => {
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(',');
+    const projectParam = project ? `&project=${project}` : '';
+    const response = await api.get(`/photos/clusters/?bbox=${bbox}&zoom=${zoom}${projectParam}`);
+    return response.data;
+  },
+};
+
+// Incremental sync: pass the token from the previous call, null for a full sync
+export const syncService = {
+  changes: async (token = null, { collections = null, limit = 500 } = {}) => {
+    const params = { limit };
+    if (token) params.token = token;
+    if (collections) params.collections = collections.join(',');
+    const response = await api.get('/sync/', { params });
+    return response.data;
+  },
 };
 
+// Streaming export download URLs ('geojson' or 'ndjson')
+export const exportUrl = (format = 'geojson') => `${API_BASE_URL}/projects/export.${format}`;
+
+// Vector tile URL templates for Leaflet vector-grid layers ('projects' or 'photos')
+export const tileUrl = (layer) => `${API_BASE_URL}/tiles/${layer}/{z}/{x}/{y}.mvt`;
+
 // Auth service
 export const authService = {
   login: async (username, password) => {